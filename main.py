@@ -4,6 +4,33 @@ import time
 import sys
 import os
 import json
+import threading
+import collections
+import struct
+import array
+import socket
+import bisect
+import gc
+import http.server
+import tracemalloc
+import glob
+import math
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # Particles are skipped without numpy
+    np = None
+
+try:
+    from pygame._sdl2 import video as sdl2_video
+except ImportError:  # Older pygame builds without the SDL2 video module
+    sdl2_video = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 # Initialize pygame
 pygame.init()
@@ -14,6 +41,7 @@ SCREEN_HEIGHT = 600
 
 # Frames per second
 FPS = 60
+SIMULATION_STEP = 1 / FPS  # seconds of game time per update, independent of the wall clock
 
 # Colors
 WHITE = (255, 255, 255)
@@ -80,24 +108,166 @@ JUMP_SOUND = os.path.join(ASSET_DIR, 'jump.wav')
 POWERUP_SOUND = os.path.join(ASSET_DIR, 'powerup.wav')
 GAME_OVER_SOUND = os.path.join(ASSET_DIR, 'game_over.wav')
 
+# Entity behaviours, power-up effects and level curves, reloaded while the game runs
+GAME_DATA_FILE = 'game_data.json'
+GAME_DATA_RELOAD_INTERVAL = 1  # seconds between checks for changes
+
+# Headless environment for bots: several games stepped side by side in one process
+ENV_NEAREST = 4  # nearest platforms and obstacles described in each observation
+ENV_LIFE_PENALTY = 100  # reward lost for each life lost
+OBSERVATION_STRIDE = 8  # screen pixels per cell of frame and grid observations, 800x600 becomes 100x75
+
 # High Score file
 HIGH_SCORE_FILE = 'high_scores.json'
 
+# Particles: name -> (color, size, gravity, lifetime in frames)
+PARTICLE_STYLES = {
+    'explosion': ((255, 140, 0), 6, 0.15, 40),
+    'debris': ((150, 150, 150), 4, 0.3, 30),
+    'shield': ((80, 160, 255), 4, 0.0, 20),
+    'star': ((255, 230, 60), 5, -0.05, 45),
+    'pickup': ((255, 255, 255), 3, 0.0, 25),
+    'trail': ((255, 90, 20), 4, -0.1, 20),
+}
+PARTICLE_CAPACITY = 4096
+PARTICLE_EMIT_BUDGET = 512  # new particles per frame
+PARTICLE_DRAW_BUDGET = 1536  # particles drawn per frame, the rest are thinned out
+PARTICLE_FADE_STEPS = 4
+
+# Animated obstacles: name -> (style, frames advanced per tick), rolling follows the distance moved
+OBSTACLE_ANIMATIONS = {
+    'moving_saw': ('spin', 1.5),
+    'rolling_barrel': ('roll', 1.0),
+    'fireball': ('flicker', 0.75),
+}
+ANIMATION_FRAMES = 32  # pre-rendered frames per animated image and size
+
+# Level transitions: banners play inside the game loop while the next level is built
+LEVEL_UP_BANNER_TIME = 2  # seconds
+GAME_OVER_BANNER_TIME = 3  # seconds
+LEVEL_BUILD_BUDGET = 4  # sprites created per frame during the banner
+
+# Spawning: weights and the difficulty budget live in the game data file, draws come from shuffled batches
+SPAWN_BATCH_SIZE = 64  # spawns per preshuffled batch of each group
+
+# Entity lifecycle: sprites above the active band sleep, sprites that scroll off the bottom are despawned
+ACTIVE_MARGIN = 100  # pixels above the screen that still count as active
+DESPAWN_MARGIN = 50  # pixels below the screen before a sprite leaves the world
+
+# Binary save state written when quitting mid-game
+SAVE_FILE = 'savegame.bin'
+
+# Spectator stream: a TCP (host, port) tuple or a Unix socket path
+SPECTATOR_STREAM = False
+SPECTATOR_ADDRESS = ('127.0.0.1', 5555)
+SPECTATOR_TICK_INTERVAL = 1  # publish every Nth tick
+SPECTATOR_MAX_BACKLOG = 64 * 1024  # bytes queued for a slow spectator before dropping it
+
+# Metrics exporter: Prometheus text written to METRICS_FILE and/or served on localhost:METRICS_PORT
+METRICS_ENABLED = False
+METRICS_FILE = 'metrics.prom'
+METRICS_PORT = None
+METRICS_WRITE_INTERVAL = 10  # seconds
+FRAME_TIME_BUCKETS = [0.001, 0.002, 0.004, 0.008, 0.0167, 0.025, 0.0333, 0.05, 0.1, 0.25]
+
+# Garbage collection: startup objects are frozen, and full collections wait until play stops
+GC_CONTROL = True
+GC_PLAY_THRESHOLD = 1000000  # generation-1 runs before an automatic full collection during play
+GC_PAUSE_WARNING = 0.002  # seconds; longer collections during play are logged
+
+# Memory profiling: tracemalloc snapshots at each level and every interval during soak runs
+MEMORY_PROFILING = False
+MEMORY_SNAPSHOT_INTERVAL = 60  # seconds
+MEMORY_GROWTH_LIMIT = 8 * 1024 * 1024  # bytes of traced growth before the run fails
+MEMORY_REPORT_TOP = 10
+
+# Frame pacing: logic runs every tick, rendering is skipped when behind
+MAX_FRAME_SKIP = 5  # consecutive renders that may be skipped
+POWER_SAVE_RENDERING = False  # Lower the render rate on battery or when running hot
+POWER_SAVE_FPS = 30
+POWER_CHECK_INTERVAL = 5  # seconds
+THERMAL_LIMIT = 80  # degrees Celsius
+
+# Input latency: key presses are timestamped when pumped and matched to the first flip that shows them
+INPUT_LATENCY_TRACKING = False  # Also switched on by the --latency command line flag
+LATE_LATCH_INPUT = False  # Pump input again right before the player moves; also the --late-latch flag
+INPUT_LATENCY_BUCKETS = [0.004, 0.008, 0.0167, 0.025, 0.0333, 0.05, 0.0667, 0.1, 0.15, 0.25]
+INPUT_LATENCY_REPORT_INTERVAL = 10  # seconds between console summaries
+
+# Gameplay capture: rendered frames are copied into a ring of buffers and written by a background thread
+CAPTURE_ENABLED = False  # Also switched on by the --record command line flag
+CAPTURE_DIR = 'captures'
+CAPTURE_FORMAT = 'raw'  # 'raw' for one frame file plus an index, 'png' for an image sequence
+CAPTURE_BUFFERS = 8  # frames the writer may fall behind by before frames are dropped
+CAPTURE_INTERVAL = 1  # capture every Nth rendered frame
+CAPTURE_COMPRESSION = 1  # zlib level for PNG frames, higher is smaller but slower to write
+CAPTURE_REPORT_INTERVAL = 5  # seconds between dropped-frame warnings
+
+# Render backend: 'surface' blits onto the display, 'sdl2' draws textures through an SDL2 Renderer
+RENDER_BACKEND = 'surface'
+SDL2_SOFTWARE_RENDERER = False  # Force SDL's software renderer, e.g. on cabinets without a GPU
+HUD_SIZE = (SCREEN_WIDTH // 2, 170)  # Top-left area the HUD text is drawn into
+
+# Internal resolution: the world is drawn at RENDER_SIZE, then scaled once per frame to WINDOW_SIZE
+RENDER_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)  # e.g. (400, 300) to trade pixels for frame rate
+WINDOW_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)  # e.g. (1600, 1200) on high-DPI displays
+SMOOTH_SCALING = False  # Filtered upscaling instead of nearest neighbour
+
+# Render pipeline: draw and flip on a separate thread from the simulation
+PIPELINED_RENDERING = False
+RENDER_BUFFERS = 2  # 2 for double buffering, 3 for triple buffering
+
+# Menus sleep on input and only redraw after events in MENU_REDRAW_EVENTS
+MENU_IDLE_TIMEOUT = 1000  # milliseconds
+MENU_REDRAW_EVENTS = {pygame.KEYDOWN, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED}
+TEXT_CACHE_SIZE = 256
+
 # Font settings
 FONT_NAME = pygame.font.match_font('arial')
 FONT_SIZE = 24
 
+# Loaded images and animation frames are shared between sprites, nothing draws onto them
+IMAGE_CACHE = {}
+ANIMATION_CACHE = {}
+
 def load_image(path, width=None, height=None):
     """Utility function to load and scale images."""
+    key = (path, width, height)
+    if key in IMAGE_CACHE:
+        return IMAGE_CACHE[key]
     try:
         image = pygame.image.load(path).convert_alpha()
         if width and height:
             image = pygame.transform.scale(image, (width, height))
+        IMAGE_CACHE[key] = image
         return image
     except pygame.error as e:
         print(f"Error loading image {path}: {e}")
         sys.exit(1)
 
+def load_frames(path, width, height, style):
+    """Utility function to pre-render the animation frames of an image."""
+    key = (path, width, height, style)
+    if key in ANIMATION_CACHE:
+        return ANIMATION_CACHE[key]
+    image = load_image(path, width, height)
+    frames = []
+    for index in range(ANIMATION_FRAMES):
+        turn = index / ANIMATION_FRAMES
+        if style == 'flicker':
+            # Pulse the size and brightness instead of rotating
+            pulse = (1 - math.cos(turn * 2 * math.pi)) / 2
+            frame = pygame.transform.rotozoom(image, 0, 1 - 0.15 * pulse)
+            frame.fill((int(60 * pulse),) * 3, special_flags=pygame.BLEND_RGB_ADD)
+        else:
+            frame = pygame.transform.rotozoom(image, -360 * turn, 1)
+        # Keep every frame the size of the original so the rect never changes
+        canvas = pygame.Surface((width, height), pygame.SRCALPHA)
+        canvas.blit(frame, frame.get_rect(center=canvas.get_rect().center))
+        frames.append(canvas.convert_alpha())
+    ANIMATION_CACHE[key] = tuple(frames)
+    return ANIMATION_CACHE[key]
+
 def load_sound(path):
     """Utility function to load sound effects."""
     try:
@@ -106,10 +276,224 @@ def load_sound(path):
         print(f"Error loading sound {path}: {e}")
         return None
 
+# Obstacle behaviours and power-up effects that the data file can refer to by name
+def obstacle_static(obstacle):
+    pass  # Spikes are stationary
+
+def obstacle_bounce(obstacle):
+    obstacle.rect.x += obstacle.speed * obstacle.direction
+    if obstacle.rect.left < 0 or obstacle.rect.right > SCREEN_WIDTH:
+        obstacle.direction *= -1
+
+def obstacle_roll(obstacle):
+    obstacle.rect.x += obstacle.speed * obstacle.direction
+    if obstacle.rect.left > SCREEN_WIDTH or obstacle.rect.right < 0:
+        obstacle.direction *= -1
+
+def obstacle_fall(obstacle):
+    obstacle.rect.y += obstacle.speed
+    if obstacle.rect.top > SCREEN_HEIGHT:
+        obstacle.rect.y = obstacle.rng.randint(-100, -40)
+        obstacle.rect.x = obstacle.rng.randint(0, SCREEN_WIDTH - obstacle.rect.width)
+
+def effect_extra_life(player, amount):
+    player.lives += amount
+
+def effect_bonus_score(player, amount):
+    player.score += amount if not player.double_score else amount * 2
+
+def effect_speed_boost(player, amount):
+    player.powered_up = True
+    player.power_up_time = player.game.now
+    player.speed = PLAYER_SPEED + amount
+
+def effect_extra_time(player, amount):
+    player.game.time_left += amount
+
+def effect_shield(player, amount):
+    player.shielded = True
+    player.shield_time = player.game.now
+
+def effect_double_score(player, amount):
+    player.double_score = True
+    player.double_score_time = player.game.now
+
+OBSTACLE_BEHAVIOURS = {
+    'static': obstacle_static,
+    'bounce': obstacle_bounce,
+    'roll': obstacle_roll,
+    'fall': obstacle_fall,
+}
+POWERUP_EFFECTS = {
+    'extra_life': effect_extra_life,
+    'bonus_score': effect_bonus_score,
+    'speed_boost': effect_speed_boost,
+    'extra_time': effect_extra_time,
+    'shield': effect_shield,
+    'double_score': effect_double_score,
+}
+OBSTACLE_TYPES = list(OBSTACLE_IMAGES)
+POWERUP_TYPES = list(POWERUP_IMAGES)
+OBSTACLE_TYPE_IDS = {obstacle_type: index for index, obstacle_type in enumerate(OBSTACLE_TYPES)}
+POWERUP_TYPE_IDS = {power_type: index for index, power_type in enumerate(POWERUP_TYPES)}
+FIREBALL_TYPE_ID = OBSTACLE_TYPE_IDS['fireball']
+PLATFORM_KINDS = ['safe', 'moving', 'disappearing', 'moving_disappearing']  # bit 0 moving, bit 1 disappearing
+LEVEL_PLATFORMS, LEVEL_OBSTACLES, LEVEL_POWERUPS = range(3)
+
+class GameData:
+    """Class to compile the game data file into integer-indexed tables and reload it on change."""
+    def __init__(self, path=GAME_DATA_FILE):
+        self.path = path
+        self.mtime = None
+        self.next_check = 0
+        try:
+            self.load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading game data {path}: {e}")
+            sys.exit(1)
+
+    def load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        # Compile everything into new tables first so a bad edit leaves the old ones in place
+        level_curves = [(self.whole(data['levels'][group]['base'], f'levels.{group}.base'),
+                         self.whole(data['levels'][group]['per_level'], f'levels.{group}.per_level'))
+                        for group in ('platforms', 'obstacles', 'powerups')]
+        hazard_budget = data['difficulty']['hazard_budget']
+        hazard_curve = (float(hazard_budget['base']), float(hazard_budget['per_level']), float(hazard_budget['max']))
+        safe_platforms = data['difficulty']['safe_platforms']
+        safe_curve = (self.whole(safe_platforms['base'], 'difficulty.safe_platforms.base'),
+                      self.whole(safe_platforms['per_level'], 'difficulty.safe_platforms.per_level', None),
+                      self.whole(safe_platforms['min'], 'difficulty.safe_platforms.min'))
+        # Spawn weight curves per group, indexed like level_curves
+        weight_curves = [[self.weight_curve(data['platforms'][kind]) for kind in PLATFORM_KINDS], [], []]
+        obstacle_behaviours = []
+        obstacle_speeds = []
+        obstacle_costs = []
+        for obstacle_type in OBSTACLE_TYPES:
+            entry = data['obstacles'][obstacle_type]
+            if entry['behaviour'] not in OBSTACLE_BEHAVIOURS:
+                raise ValueError(f"unknown behaviour {entry['behaviour']!r} for {obstacle_type}")
+            low, high = entry['speed']
+            low = self.whole(low, f'obstacles.{obstacle_type}.speed')
+            high = self.whole(high, f'obstacles.{obstacle_type}.speed')
+            if low > high:
+                raise ValueError(f"speed range {entry['speed']} for {obstacle_type} is inverted")
+            obstacle_behaviours.append(OBSTACLE_BEHAVIOURS[entry['behaviour']])
+            obstacle_speeds.append((low, high))
+            obstacle_costs.append(float(entry['cost']))
+            weight_curves[LEVEL_OBSTACLES].append(self.weight_curve(entry))
+        powerup_effects = []
+        for power_type in POWERUP_TYPES:
+            entry = data['powerups'][power_type]
+            if entry['effect'] not in POWERUP_EFFECTS:
+                raise ValueError(f"unknown effect {entry['effect']!r} for {power_type}")
+            powerup_effects.append((POWERUP_EFFECTS[entry['effect']],
+                                    self.whole(entry['amount'], f'powerups.{power_type}.amount')))
+            weight_curves[LEVEL_POWERUPS].append(self.weight_curve(entry))
+        self.level_curves = level_curves
+        self.hazard_curve = hazard_curve
+        self.safe_curve = safe_curve
+        self.weight_curves = weight_curves
+        self.obstacle_behaviours = obstacle_behaviours
+        self.obstacle_speeds = obstacle_speeds
+        self.obstacle_costs = obstacle_costs
+        self.powerup_effects = powerup_effects
+        self.mtime = mtime
+
+    @staticmethod
+    def whole(value, name, minimum=0):
+        """Check that a data file value is a whole number of at least minimum and return it as an int."""
+        if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+                or value != int(value)):
+            raise ValueError(f'{name} must be a whole number, not {value!r}')
+        if minimum is not None and value < minimum:
+            raise ValueError(f'{name} must be at least {minimum}, not {value!r}')
+        return int(value)
+
+    @staticmethod
+    def weight_curve(entry):
+        weight = entry['weight']
+        return float(weight['base']), float(weight['per_level'])
+
+    def level_count(self, group, level):
+        base, per_level = self.level_curves[group]
+        return base + per_level * level
+
+    def spawn_weights(self, group, level):
+        """Relative spawn weight of each platform kind, obstacle type or power-up type at a level."""
+        return [max(0.0, base + per_level * level) for base, per_level in self.weight_curves[group]]
+
+    def hazard_budget(self, level):
+        """Total obstacle cost allowed within a screen above the top of the view."""
+        base, per_level, most = self.hazard_curve
+        return min(most, base + per_level * level)
+
+    def safe_platforms(self, level):
+        """Platforms that neither move nor disappear to keep around before any other kind spawns."""
+        base, per_level, least = self.safe_curve
+        return max(least, base + per_level * level)
+
+    def poll(self):
+        """Reload the data file if it changed on disk, keeping the old tables if it is invalid."""
+        now = time.time()
+        if now < self.next_check:
+            return False
+        self.next_check = now + GAME_DATA_RELOAD_INTERVAL
+        mtime = self.mtime
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self.mtime:
+                return False
+            self.load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error reloading game data {self.path}: {e}")
+            self.mtime = mtime  # Report each bad edit once rather than every check
+            return False
+        print(f"Reloaded game data from {self.path}")
+        return True
+
+GAME_DATA = GameData()
+
+def collide_swept(player, sprite):
+    """Collision callback testing a sprite against the area the player swept this tick."""
+    return player.swept_rect.colliderect(sprite.rect)
+
+class ContactManager:
+    """Class to track the platform currently supporting the player."""
+    def __init__(self):
+        self.ground = None
+        self.ground_x = 0
+
+    @property
+    def grounded(self):
+        return self.ground is not None and self.ground.alive()
+
+    def land(self, platform):
+        self.ground = platform
+        self.ground_x = platform.rect.x
+
+    def release(self):
+        self.ground = None
+
+    def update(self, rect):
+        """Carry the rect along with its platform, dropping contact once it is gone."""
+        ground = self.ground
+        if ground is None:
+            return
+        if not ground.alive() or rect.right <= ground.rect.left or rect.left >= ground.rect.right:
+            self.ground = None
+            return
+        rect.x += ground.rect.x - self.ground_x
+        rect.bottom = ground.rect.top
+        self.ground_x = ground.rect.x
+
 class Player(pygame.sprite.Sprite):
     """Class representing the player character."""
-    def __init__(self, x, y):
+    def __init__(self, x, y, game):
         super().__init__()
+        self.game = game
         self.image = load_image(PLAYER_IMAGE, PLAYER_WIDTH, PLAYER_HEIGHT)
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
@@ -124,54 +508,77 @@ class Player(pygame.sprite.Sprite):
         self.shield_time = 0
         self.double_score = False
         self.double_score_time = 0
+        self.contacts = ContactManager()
+        self.swept_rect = self.rect.copy()
 
-        # Load sounds
-        self.jump_sound = load_sound(JUMP_SOUND)
-        self.powerup_sound = load_sound(POWERUP_SOUND)
-        self.game_over_sound = load_sound(GAME_OVER_SOUND)
+        # Load sounds, headless games stay silent
+        self.jump_sound = None if game.headless else load_sound(JUMP_SOUND)
+        self.powerup_sound = None if game.headless else load_sound(POWERUP_SOUND)
+        self.game_over_sound = None if game.headless else load_sound(GAME_OVER_SOUND)
 
-    def update(self, platforms):
-        self.handle_input()
+    def update(self, platforms, action=None):
+        self.contacts.update(self.rect)
+        self.handle_input(action)
         self.apply_gravity()
         self.check_collisions(platforms)
+        self.check_fall()
         self.update_power_up_status()
 
-    def handle_input(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
-        if keys[pygame.K_SPACE]:
+    def handle_input(self, action=None):
+        """Move and jump from the keyboard, or from a (direction, jump) action when a bot is playing."""
+        if action is None:
+            keys = pygame.key.get_pressed()
+            action = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT], keys[pygame.K_SPACE])
+        direction, jump = action
+        self.rect.x += direction * self.speed
+        if jump:
             self.jump()
 
     def jump(self):
-        self.rect.y += 1  # Move down slightly to check for platform
-        hits = pygame.sprite.spritecollide(self, game.platforms, False)
-        self.rect.y -= 1  # Move back to original position
-        if hits:
+        if self.contacts.grounded:
+            self.contacts.release()
             self.velocity_y = -self.jump_speed
             if self.jump_sound:
                 self.jump_sound.play()
 
     def apply_gravity(self):
+        if self.contacts.grounded:
+            self.velocity_y = 0
+            self.swept_rect = self.rect.copy()
+            return
+        start = self.rect.copy()
         self.velocity_y += GRAVITY
         self.rect.y += self.velocity_y
+        # Cover everything between the old and new position so fast falls can't tunnel
+        self.swept_rect = start.union(self.rect)
+
+    def check_fall(self):
+        # Only after landing was resolved, so a fall that crossed a platform top near the bottom still lands
         if self.rect.bottom > SCREEN_HEIGHT:
             self.lives -= 1
             self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
             self.velocity_y = 0
+            self.swept_rect = self.rect.copy()
+            self.contacts.release()
             if self.lives <= 0 and self.game_over_sound:
                 self.game_over_sound.play()
 
     def check_collisions(self, platforms):
-        hits = pygame.sprite.spritecollide(self, platforms, False)
-        if hits and self.velocity_y > 0:
-            self.rect.bottom = hits[0].rect.top
+        if self.contacts.grounded or self.velocity_y <= 0:
+            return
+        hits = pygame.sprite.spritecollide(self, platforms, False, collide_swept)
+        if hits:
+            # Land on the first platform whose top the feet crossed, else the one overlapped
+            start_bottom = self.swept_rect.top + self.rect.height
+            crossed = [hit for hit in hits if hit.rect.top >= start_bottom]
+            platform = min(crossed or hits, key=lambda hit: hit.rect.top)
+            self.rect.bottom = platform.rect.top
             self.velocity_y = 0
+            self.swept_rect.height = self.rect.bottom - self.swept_rect.top
+            self.contacts.land(platform)
 
     def update_power_up_status(self):
-        current_time = time.time()
+        current_time = self.game.now
         if self.powered_up and current_time - self.power_up_time > POWERUP_DURATION:
             self.powered_up = False
             self.speed = PLAYER_SPEED
@@ -181,22 +588,8 @@ class Player(pygame.sprite.Sprite):
             self.double_score = False
 
     def power_up(self, power_type):
-        if power_type == 'extra_life':
-            self.lives += 1
-        elif power_type == 'bonus_star':
-            self.score += 100 if not self.double_score else 200
-        elif power_type == 'power_ball':
-            self.powered_up = True
-            self.power_up_time = time.time()
-            self.speed = PLAYER_SPEED + 3
-        elif power_type == 'time_extension':
-            game.time_left += 30
-        elif power_type == 'shield':
-            self.shielded = True
-            self.shield_time = time.time()
-        elif power_type == 'double_score':
-            self.double_score = True
-            self.double_score_time = time.time()
+        effect, amount = GAME_DATA.powerup_effects[POWERUP_TYPE_IDS[power_type]]
+        effect(self, amount)
 
 class Platform(pygame.sprite.Sprite):
     """Class representing platforms."""
@@ -214,54 +607,53 @@ class Platform(pygame.sprite.Sprite):
         self.disappearing = disappearing
         self.disappear_start_time = None
 
-    def update(self):
+    def update(self, ground, now):
         if self.moving:
             self.rect.x += self.speed * self.direction
             if abs(self.rect.x - self.start_x) > self.range:
                 self.direction *= -1
         if self.disappearing:
             if self.disappear_start_time is None:
-                self.disappear_start_time = time.time()
-            elif time.time() - self.disappear_start_time > DISAPPEAR_DURATION:
+                if ground is self:  # Start the countdown once the player stands on it
+                    self.disappear_start_time = now
+            elif now - self.disappear_start_time > DISAPPEAR_DURATION:
                 self.kill()  # Platform disappears
 class Obstacle(pygame.sprite.Sprite):
     """Class representing obstacles."""
-    def __init__(self, x, y, obstacle_type):
+    def __init__(self, x, y, obstacle_type, rng=random):
         super().__init__()
+        self.rng = rng  # The owning game's random generator, used by behaviours too
         self.image = load_image(OBSTACLE_IMAGES[obstacle_type], OBSTACLE_SIZE, OBSTACLE_SIZE)
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
         self.type = obstacle_type
-        self.speed = random.randint(2, 5)
-        self.direction = random.choice([-1, 1])
+        self.type_id = OBSTACLE_TYPE_IDS[obstacle_type]
+        self.speed = rng.randint(*GAME_DATA.obstacle_speeds[self.type_id])
+        self.direction = rng.choice([-1, 1])
+        self.animation = OBSTACLE_ANIMATIONS.get(obstacle_type)
+        if self.animation:
+            self.frames = load_frames(OBSTACLE_IMAGES[obstacle_type], OBSTACLE_SIZE, OBSTACLE_SIZE, self.animation[0])
+            self.phase = float(x % ANIMATION_FRAMES)  # Spread out so neighbours don't move in lockstep
+            self.image = self.frames[int(self.phase)]
 
     def update(self):
-        if self.type == 'moving_saw':
-            self.rect.x += self.speed * self.direction
-            if self.rect.left < 0 or self.rect.right > SCREEN_WIDTH:
-                self.direction *= -1
-        elif self.type == 'falling_rock':
-            self.rect.y += self.speed
-            if self.rect.top > SCREEN_HEIGHT:
-                self.rect.y = random.randint(-100, -40)
-                self.rect.x = random.randint(0, SCREEN_WIDTH - self.rect.width)
-        elif self.type == 'rolling_barrel':
-            self.rect.x += self.speed * self.direction
-            if self.rect.left > SCREEN_WIDTH or self.rect.right < 0:
-                self.direction *= -1
-        elif self.type == 'fireball':
-            self.rect.y += self.speed
-            if self.rect.top > SCREEN_HEIGHT:
-                self.rect.y = random.randint(-100, -40)
-                self.rect.x = random.randint(0, SCREEN_WIDTH - self.rect.width)
-        elif self.type == 'bomb':
-            self.rect.y += self.speed
-            if self.rect.top > SCREEN_HEIGHT:
-                self.rect.y = random.randint(-100, -40)
-                self.rect.x = random.randint(0, SCREEN_WIDTH - self.rect.width)
-        elif self.type == 'spike':
-            pass  # Spikes are stationary
+        x = self.rect.x
+        GAME_DATA.obstacle_behaviours[self.type_id](self)
+        if self.animation:
+            self.animate(self.rect.x - x)
+
+    def animate(self, dx):
+        style, rate = self.animation
+        if style == 'roll':
+            # One full turn per circumference travelled
+            self.phase += dx * rate * ANIMATION_FRAMES / (math.pi * OBSTACLE_SIZE)
+        elif style == 'spin':
+            self.phase += rate * self.direction
+        else:
+            self.phase += rate
+        self.phase %= ANIMATION_FRAMES
+        self.image = self.frames[int(self.phase) % ANIMATION_FRAMES]
 
 class PowerUp(pygame.sprite.Sprite):
     """Class representing power-ups."""
@@ -280,6 +672,21 @@ class UIManager:
     """Class to manage UI elements."""
     def __init__(self):
         self.font = pygame.font.Font(FONT_NAME, FONT_SIZE)
+        self.text_cache = {}
+
+    def text(self, text, color=WHITE):
+        """Render a string once and reuse the surface on later redraws."""
+        key = (text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) >= TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            surface = self.text_cache[key] = self.font.render(text, True, color)
+        return surface
+
+    def draw_centered(self, screen, text, y, color=WHITE):
+        text_surface = self.text(text, color)
+        screen.blit(text_surface, (SCREEN_WIDTH // 2 - text_surface.get_width() // 2, y))
 
     def draw(self, screen, player, time_left):
         lives_text = self.font.render(f'Lives: {player.lives}', True, WHITE)
@@ -293,11 +700,11 @@ class UIManager:
         screen.blit(shield_text, (10, 100))
         screen.blit(double_score_text, (10, 130))
 
-    def draw_level_up(self, screen, level):
-        level_text = self.font.render(f'Level {level}!', True, WHITE)
+    def draw_level_up(self, screen, level, offset_y=0):
+        level_text = self.text(f'Level {level}!')
         level_up_image = load_image(LEVEL_UP_IMAGE, 400, 100)
-        screen.blit(level_up_image, (SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2 - 150))
-        screen.blit(level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, SCREEN_HEIGHT // 2 - level_text.get_height() // 2))
+        screen.blit(level_up_image, (SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2 - 150 + offset_y))
+        screen.blit(level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, SCREEN_HEIGHT // 2 - level_text.get_height() // 2 + offset_y))
 
     def draw_game_over(self, screen, score):
         game_over_text = self.font.render('GAME OVER', True, WHITE)
@@ -326,88 +733,1704 @@ class HighScoreManager:
         self.scores = sorted(self.scores, key=lambda x: x['score'], reverse=True)[:10]
         self.save_scores()
 
-    def draw(self, screen):
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        title_text = font.render('High Scores', True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 100))
+    def draw(self, screen, ui_manager):
+        ui_manager.draw_centered(screen, 'High Scores', 100)
         for idx, score in enumerate(self.scores):
-            score_text = font.render(f"{idx + 1}. {score['name']} - {score['score']}", True, WHITE)
-            screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, 150 + idx * 30))
-class Game:
-    """Main game class."""
-    def __init__(self):
+            ui_manager.draw_centered(screen, f"{idx + 1}. {score['name']} - {score['score']}", 150 + idx * 30)
+# Immutable per-frame state handed from the simulation to the renderer
+FrameSnapshot = collections.namedtuple('FrameSnapshot', ['background', 'sprites', 'hud', 'time_left', 'state',
+                                                       'level', 'banner_offset', 'inputs'])
+HudState = collections.namedtuple('HudState', ['lives', 'score', 'shielded', 'double_score'])
+
+class RenderPipeline:
+    """Class to render frame snapshots on a background thread."""
+    def __init__(self, render, buffers=RENDER_BUFFERS):
+        self.render = render
+        # One buffer is always being drawn, the rest queue up pending snapshots
+        self.pending = collections.deque(maxlen=max(1, buffers - 1))
+        self.condition = threading.Condition()
+        self.busy = False
+        self.running = True
+        self.frames_rendered = 0
+        self.frames_dropped = 0
+        self.thread = threading.Thread(target=self.render_loop, name='render', daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        with self.condition:
+            if len(self.pending) == self.pending.maxlen:
+                self.frames_dropped += 1  # Renderer is behind, replace the oldest frame
+            self.pending.append(snapshot)
+            self.condition.notify_all()
+
+    def sync(self):
+        """Block until every submitted snapshot has been drawn and the screen is free."""
+        with self.condition:
+            while self.pending or self.busy:
+                self.condition.wait()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+
+    def render_loop(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                snapshot = self.pending.popleft()
+                self.busy = True
+            try:
+                self.render(snapshot)
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.frames_rendered += 1
+                    self.condition.notify_all()
+
+class SaveStateManager:
+    """Class to pack the full game state into a compact binary snapshot and back."""
+    MAGIC = b'RRS2'
+    # level, state, background, time left, platform/obstacle/power-up counts, has rng and spawn batch state
+    HEADER = struct.Struct('<4sHBBdHHHB')
+    # x, y, velocity, lives, score, speed, power-up/shield/double-score elapsed, ground index, ground x
+    PLAYER = struct.Struct('<iidhihdddhi')
+    # x, y, start x, moving, direction, range, speed, disappearing, disappear elapsed
+    PLATFORM = struct.Struct('<iiiBbhhBd')
+    # x, y, type, speed, direction
+    OBSTACLE = struct.Struct('<iiBhb')
+    # x, y, type
+    POWERUP = struct.Struct('<iiB')
+    # Entries left in the platform, obstacle and power-up spawn batches, followed by the entries
+    SPAWN = struct.Struct('<HHH')
+    RANDOM = struct.Struct('<iBd')
+    STATES = ['playing', 'game_over', 'level_up']
+
+    def pack(self, game, include_random=True):
+        now = game.now
+        player = game.player
+        platforms = list(game.platforms)
+        obstacles = list(game.obstacles)
+        powerups = list(game.powerups)
+        ground = player.contacts.ground
+        ground_index = platforms.index(ground) if player.contacts.grounded else -1
+        parts = [
+            self.HEADER.pack(self.MAGIC, game.level, self.STATES.index(game.state),
+                             game.backgrounds.index(game.background), game.time_left,
+                             len(platforms), len(obstacles), len(powerups), include_random),
+            self.PLAYER.pack(player.rect.x, player.rect.y, player.velocity_y, player.lives,
+                             player.score, player.speed,
+                             now - player.power_up_time if player.powered_up else -1.0,
+                             now - player.shield_time if player.shielded else -1.0,
+                             now - player.double_score_time if player.double_score else -1.0,
+                             ground_index, player.contacts.ground_x),
+        ]
+        for platform in platforms:
+            started = platform.disappear_start_time
+            parts.append(self.PLATFORM.pack(platform.rect.x, platform.rect.y, platform.start_x,
+                                            platform.moving, platform.direction, platform.range,
+                                            platform.speed, platform.disappearing,
+                                            -1.0 if started is None else now - started))
+        for obstacle in obstacles:
+            parts.append(self.OBSTACLE.pack(obstacle.rect.x, obstacle.rect.y,
+                                            obstacle.type_id,
+                                            obstacle.speed, obstacle.direction))
+        for powerup in powerups:
+            parts.append(self.POWERUP.pack(powerup.rect.x, powerup.rect.y,
+                                           POWERUP_TYPE_IDS[powerup.type]))
+        if include_random:
+            batches = game.spawn_director.batches
+            parts.append(self.SPAWN.pack(*map(len, batches)))
+            parts += [bytes(batch) for batch in batches]
+            version, internal, gauss_next = game.rng.getstate()
+            parts.append(self.RANDOM.pack(version, gauss_next is not None, gauss_next or 0.0))
+            parts.append(array.array('I', internal).tobytes())
+        return b''.join(parts)
+
+    def unpack(self, game, data):
+        now = game.now
+        view = memoryview(data)
+        (magic, level, state, background, time_left, platform_count, obstacle_count,
+         powerup_count, has_random) = self.HEADER.unpack_from(view, 0)
+        if magic != self.MAGIC:
+            raise ValueError('Not a Rapid Roll save state')
+        offset = self.HEADER.size
+        (x, y, velocity_y, lives, score, speed, power_up_elapsed, shield_elapsed,
+         double_score_elapsed, ground_index, ground_x) = self.PLAYER.unpack_from(view, offset)
+        offset += self.PLAYER.size
+
+        # Sprite constructors draw on the RNG, so restore it only after rebuilding them
+        platforms = []
+        for record in self.PLATFORM.iter_unpack(view[offset:offset + platform_count * self.PLATFORM.size]):
+            px, py, start_x, moving, direction, move_range, platform_speed, disappearing, disappear_elapsed = record
+            platform = Platform(px, py, moving=bool(moving), direction=direction, range=move_range,
+                                disappearing=bool(disappearing))
+            platform.start_x = start_x
+            platform.speed = platform_speed
+            platform.disappear_start_time = None if disappear_elapsed < 0 else now - disappear_elapsed
+            platforms.append(platform)
+        offset += platform_count * self.PLATFORM.size
+        obstacles = []
+        for ox, oy, obstacle_type, obstacle_speed, direction in self.OBSTACLE.iter_unpack(
+                view[offset:offset + obstacle_count * self.OBSTACLE.size]):
+            obstacle = Obstacle(ox, oy, OBSTACLE_TYPES[obstacle_type], game.rng)
+            obstacle.speed = obstacle_speed
+            obstacle.direction = direction
+            obstacles.append(obstacle)
+        offset += obstacle_count * self.OBSTACLE.size
+        powerups = [PowerUp(ux, uy, POWERUP_TYPES[power_type]) for ux, uy, power_type in
+                    self.POWERUP.iter_unpack(view[offset:offset + powerup_count * self.POWERUP.size])]
+        offset += powerup_count * self.POWERUP.size
+        if offset > len(view):
+            raise ValueError('Save state is truncated')
+        batches = [[], [], []]
+        random_state = None
+        if has_random:
+            lengths = self.SPAWN.unpack_from(view, offset)
+            offset += self.SPAWN.size
+            for batch, length in zip(batches, lengths):
+                batch += view[offset:offset + length]
+                offset += length
+            version, has_gauss, gauss_next = self.RANDOM.unpack_from(view, offset)
+            offset += self.RANDOM.size
+            internal = array.array('I')
+            internal.frombytes(view[offset:])
+            random_state = (version, tuple(internal), gauss_next if has_gauss else None)
+
+        # Everything is parsed, so a corrupt file fails above without touching the game
+        state = self.STATES[state]
+        background = game.backgrounds[background]
+        if random_state:
+            game.rng.setstate(random_state)
+        director = game.spawn_director
+        director.reset(level)
+        for batch, entries in zip(director.batches, batches):
+            batch += entries
+        game.level = level
+        game.state = state
+        game.background = background
+        game.time_left = time_left
+        game.start_time = now
+        game.all_sprites.empty()
+        game.platforms.empty()
+        game.obstacles.empty()
+        game.powerups.empty()
+        game.all_sprites.add(game.player, *platforms, *obstacles, *powerups)
+        game.platforms.add(*platforms)
+        game.obstacles.add(*obstacles)
+        game.powerups.add(*powerups)
+        game.lifecycle.reset(game)
+
+        player = game.player
+        player.rect.topleft = (x, y)
+        player.swept_rect = player.rect.copy()
+        player.velocity_y = velocity_y
+        player.lives = lives
+        player.score = score
+        player.speed = speed
+        player.powered_up = power_up_elapsed >= 0
+        player.power_up_time = now - power_up_elapsed if player.powered_up else 0
+        player.shielded = shield_elapsed >= 0
+        player.shield_time = now - shield_elapsed if player.shielded else 0
+        player.double_score = double_score_elapsed >= 0
+        player.double_score_time = now - double_score_elapsed if player.double_score else 0
+        player.contacts.release()
+        if ground_index >= 0:
+            player.contacts.land(platforms[ground_index])
+            player.contacts.ground_x = ground_x
+
+    def save(self, game, path=SAVE_FILE):
+        with open(path, 'wb') as f:
+            f.write(self.pack(game))
+
+    def load(self, game, path=SAVE_FILE):
+        """Restore the save and remove it; raises ValueError if it is unreadable."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        random_state = game.rng.getstate()
+        try:
+            self.unpack(game, data)
+        except (struct.error, IndexError, ValueError) as e:
+            game.rng.setstate(random_state)  # Rebuilt sprites drew on it before the damage showed up
+            raise ValueError(f'unreadable save state: {e}') from e
+        self.discard(path)  # A save is continued once; quitting mid-game writes a fresh one
+
+    def discard(self, path=SAVE_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+
+# Sprite kinds shared by the spectator stream and its viewer
+ENTITY_KINDS = ['player', 'platform'] + list(OBSTACLE_IMAGES) + list(POWERUP_IMAGES)
+ENTITY_KIND_INDEX = {kind: index for index, kind in enumerate(ENTITY_KINDS)}
+
+class SpectatorStream:
+    """Class to publish delta-encoded game state to spectators over a local socket."""
+    FRAME = struct.Struct('<H')
+    # tick, flags, background, lives, score, time left
+    HEADER = struct.Struct('<IBBhiH')
+    SPAWN = struct.Struct('<BHBhh')  # op, id, kind, x, y
+    MOVE = struct.Struct('<BHbb')  # op, id, dx, dy
+    REMOVE = struct.Struct('<BH')  # op, id
+    OP_SPAWN, OP_MOVE, OP_REMOVE = range(3)
+    FLAG_KEYFRAME = 1
+    FLAG_GAME_OVER = 2
+    FLAG_SHIELDED = 4
+    FLAG_DOUBLE_SCORE = 8
+
+    def __init__(self, address=SPECTATOR_ADDRESS):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.remove(address)
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen()
+        self.server.setblocking(False)
+        self.address = self.server.getsockname()
+        self.clients = {}  # socket -> unsent bytes
+        self.entities = {}  # sprite -> (id, kind, x, y)
+        self.next_id = 0
+        self.free_ids = collections.deque()  # IDs of removed entities, reused oldest first
+        self.tick = 0
+        self.bytes_sent = 0
+
+    def publish(self, game):
+        self.tick += 1
+        if self.tick % SPECTATOR_TICK_INTERVAL:
+            return
+        # Keyframes for new spectators hold last tick's entities, which this tick's delta advances
+        self.accept_clients(game)
+        previous = self.entities
+        current = {}
+        delta = []
+        for sprite in game.all_sprites:
+            x, y = sprite.rect.topleft
+            entry = previous.get(sprite)
+            if entry is None:
+                kind = ENTITY_KIND_INDEX['player' if sprite is game.player else
+                                         'platform' if isinstance(sprite, Platform) else sprite.type]
+                entry = (self.allocate_id(), kind, x, y)
+                delta.append(self.SPAWN.pack(self.OP_SPAWN, entry[0], kind, x, y))
+            else:
+                entity_id, kind, old_x, old_y = entry
+                dx, dy = x - old_x, y - old_y
+                if -128 <= dx < 128 and -128 <= dy < 128:
+                    if dx or dy:
+                        delta.append(self.MOVE.pack(self.OP_MOVE, entity_id, dx, dy))
+                else:
+                    delta.append(self.SPAWN.pack(self.OP_SPAWN, entity_id, kind, x, y))
+                entry = (entity_id, kind, x, y)
+            current[sprite] = entry
+        for sprite, entry in previous.items():
+            if sprite not in current:
+                delta.append(self.REMOVE.pack(self.OP_REMOVE, entry[0]))
+                self.free_ids.append(entry[0])  # Freed after this tick's spawns, so never reused mid-delta
+        self.entities = current
+
+        if self.clients:
+            self.send_all(self.encode(game, 0, delta))
+
+    def allocate_id(self):
+        """Hand out an ID no live entity holds; wrapping a counter would collide with long-lived ones."""
+        if self.free_ids:
+            return self.free_ids.popleft()
+        entity_id = self.next_id
+        self.next_id += 1
+        return entity_id
+
+    def encode(self, game, flags, records):
+        player = game.player
+        if game.state == 'game_over':
+            flags |= self.FLAG_GAME_OVER
+        if player.shielded:
+            flags |= self.FLAG_SHIELDED
+        if player.double_score:
+            flags |= self.FLAG_DOUBLE_SCORE
+        header = self.HEADER.pack(self.tick, flags, game.backgrounds.index(game.background),
+                                  player.lives, player.score, max(0, int(game.time_left)))
+        payload = header + b''.join(records)
+        return self.FRAME.pack(len(payload)) + payload
+
+    def keyframe(self, game):
+        records = [self.SPAWN.pack(self.OP_SPAWN, entity_id, kind, x, y)
+                   for entity_id, kind, x, y in self.entities.values()]
+        return self.encode(game, self.FLAG_KEYFRAME, records)
+
+    def accept_clients(self, game):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except (BlockingIOError, OSError):
+                return
+            client.setblocking(False)
+            # New spectators start from a full keyframe, then follow the deltas
+            self.clients[client] = bytearray(self.keyframe(game))
+
+    def send_all(self, message):
+        for client, outbox in list(self.clients.items()):
+            outbox += message
+            try:
+                sent = client.send(outbox)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self.drop(client)
+                continue
+            self.bytes_sent += sent
+            del outbox[:sent]
+            if len(outbox) > SPECTATOR_MAX_BACKLOG:
+                self.drop(client)  # Too slow to keep up, it can reconnect for a fresh keyframe
+
+    def drop(self, client):
+        del self.clients[client]
+        client.close()
+
+    def close(self):
+        for client in list(self.clients):
+            self.drop(client)
+        self.server.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+class SpectatorViewer:
+    """Class to mirror a running game from its spectator stream."""
+    def __init__(self, address=SPECTATOR_ADDRESS):
+        self.address = address
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption('Rapid Roll Clone - Spectator')
+        self.clock = pygame.time.Clock()
+        self.running = True
+        self.sock = None
+        self.buffer = bytearray()
+        self.entities = {}  # id -> [kind, x, y]
+        self.hud = HudState(0, 0, False, False)
+        self.time_left = 0
+        self.game_over = False
+        self.ui_manager = UIManager()
+        self.backgrounds = [load_image(bg, SCREEN_WIDTH, SCREEN_HEIGHT) for bg in BACKGROUND_IMAGES]
+        self.background = self.backgrounds[0]
+        self.images = []
+        for kind in ENTITY_KINDS:
+            if kind == 'player':
+                self.images.append(load_image(PLAYER_IMAGE, PLAYER_WIDTH, PLAYER_HEIGHT))
+            elif kind == 'platform':
+                self.images.append(load_image(PLATFORM_IMAGE, PLATFORM_WIDTH, PLATFORM_HEIGHT))
+            elif kind in OBSTACLE_IMAGES:
+                self.images.append(load_image(OBSTACLE_IMAGES[kind], OBSTACLE_SIZE, OBSTACLE_SIZE))
+            else:
+                self.images.append(load_image(POWERUP_IMAGES[kind], POWERUP_SIZE, POWERUP_SIZE))
+
+    def connect(self):
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            return False
+        sock.setblocking(False)
+        self.sock = sock
+        self.buffer.clear()
+        return True
+
+    def receive(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                self.sock.close()
+                self.sock = None
+                break
+            self.buffer += data
+        frame = SpectatorStream.FRAME
+        while len(self.buffer) >= frame.size:
+            (length,) = frame.unpack_from(self.buffer, 0)
+            if len(self.buffer) < frame.size + length:
+                break
+            self.apply(memoryview(self.buffer)[frame.size:frame.size + length].tobytes())
+            del self.buffer[:frame.size + length]
+
+    def apply(self, payload):
+        stream = SpectatorStream
+        tick, flags, background, lives, score, time_left = stream.HEADER.unpack_from(payload, 0)
+        if flags & stream.FLAG_KEYFRAME:
+            self.entities.clear()
+        self.background = self.backgrounds[background]
+        self.hud = HudState(lives, score, bool(flags & stream.FLAG_SHIELDED), bool(flags & stream.FLAG_DOUBLE_SCORE))
+        self.time_left = time_left
+        self.game_over = bool(flags & stream.FLAG_GAME_OVER)
+        offset = stream.HEADER.size
+        while offset < len(payload):
+            op = payload[offset]
+            if op == stream.OP_SPAWN:
+                _, entity_id, kind, x, y = stream.SPAWN.unpack_from(payload, offset)
+                self.entities[entity_id] = [kind, x, y]
+                offset += stream.SPAWN.size
+            elif op == stream.OP_MOVE:
+                _, entity_id, dx, dy = stream.MOVE.unpack_from(payload, offset)
+                entity = self.entities.get(entity_id)
+                if entity is not None:  # Unknown IDs are skipped; the next keyframe resynchronises
+                    entity[1] += dx
+                    entity[2] += dy
+                offset += stream.MOVE.size
+            else:
+                _, entity_id = stream.REMOVE.unpack_from(payload, offset)
+                self.entities.pop(entity_id, None)
+                offset += stream.REMOVE.size
+
+    def draw(self):
+        self.screen.blit(self.background, (0, 0))
+        images = self.images
+        self.screen.blits([(images[kind], (x, y)) for kind, x, y in self.entities.values()], doreturn=False)
+        if self.sock is None:
+            waiting_text = self.ui_manager.font.render('Waiting for game...', True, WHITE)
+            self.screen.blit(waiting_text, (SCREEN_WIDTH // 2 - waiting_text.get_width() // 2, SCREEN_HEIGHT // 2))
+        else:
+            self.ui_manager.draw(self.screen, self.hud, self.time_left)
+            if self.game_over:
+                self.ui_manager.draw_game_over(self.screen, self.hud.score)
+        pygame.display.flip()
+
+    def run(self):
+        last_attempt = 0
+        while self.running:
+            self.clock.tick(FPS)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_q):
+                    self.running = False
+            if self.sock is None and time.time() - last_attempt > 1:
+                last_attempt = time.time()
+                self.connect()
+            if self.sock is not None:
+                self.receive()
+            self.draw()
+        if self.sock is not None:
+            self.sock.close()
+        pygame.quit()
+        sys.exit()
+
+def power_saving_active():
+    """Return True when running on battery or a thermal zone is past THERMAL_LIMIT."""
+    for status_path in glob.glob('/sys/class/power_supply/*/status'):
+        try:
+            with open(status_path) as f:
+                if f.read().strip() == 'Discharging':
+                    return True
+        except OSError:
+            pass
+    for temp_path in glob.glob('/sys/class/thermal/thermal_zone*/temp'):
+        try:
+            with open(temp_path) as f:
+                if int(f.read()) > THERMAL_LIMIT * 1000:  # millidegrees Celsius
+                    return True
+        except (OSError, ValueError):
+            pass
+    return False
+
+class FramePacer:
+    """Class to keep the simulation at a fixed rate, skipping renders when frames overrun."""
+    def __init__(self, fps=FPS, max_skip=MAX_FRAME_SKIP, power_saving=POWER_SAVE_RENDERING):
+        self.step = 1.0 / fps
+        self.max_skip = max_skip
+        self.power_saving = power_saving
+        self.render_interval = self.step
+        self.next_tick = time.perf_counter()
+        self.last_tick = self.next_tick
+        self.next_render = self.next_tick
+        self.next_power_check = self.next_tick
+        self.frame_time = 0.0
+        self.update_cost = 0.0
+        self.render_cost = 0.0
+        self.skipped = 0  # consecutive renders skipped
+        self.skipped_total = 0
+        self.throttled_total = 0
+        self.rendered_total = 0
+        self.resumed = 0.0  # when the loop last came back from blocking outside it
+
+    def wait(self):
+        """Sleep until the next simulation tick is due."""
+        now = time.perf_counter()
+        if now < self.next_tick:
+            time.sleep(self.next_tick - now)
+            now = time.perf_counter()
+        elif now - self.next_tick > self.step * (self.max_skip + 1):
+            self.next_tick = now  # Too far behind to catch up, drop the backlog instead of spiralling
+        self.next_tick += self.step
+        self.frame_time = now - self.last_tick
+        self.last_tick = now
+
+    def resume(self):
+        """Restart pacing after the loop blocked, e.g. in the pause menu, so the time isn't counted or caught up."""
+        now = time.perf_counter()
+        self.next_tick = now
+        self.last_tick = now
+        self.resumed = now
+
+    def record_update(self, cost):
+        self.update_cost += (cost - self.update_cost) * 0.1
+
+    def record_render(self, cost):
+        self.render_cost += (cost - self.render_cost) * 0.1
+
+    def should_render(self):
+        """Decide whether this tick gets drawn; logic always runs, only rendering is skipped."""
+        now = time.perf_counter()
+        if self.power_saving and now >= self.next_power_check:
+            self.next_power_check = now + POWER_CHECK_INTERVAL
+            self.render_interval = 1.0 / POWER_SAVE_FPS if power_saving_active() else self.step
+        if self.skipped < self.max_skip:
+            if now < self.next_render:
+                self.skipped += 1
+                self.throttled_total += 1
+                return False
+            if now + self.render_cost > self.next_tick:
+                # Drawing now would push the next tick late
+                self.skipped += 1
+                self.skipped_total += 1
+                return False
+        self.skipped = 0
+        self.rendered_total += 1
+        self.next_render = max(self.next_render + self.render_interval, now)
+        return True
+
+class Histogram:
+    """Class to count observations into fixed buckets."""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def expose(self, name, help_text):
+        return [f'# HELP {name} {help_text}', f'# TYPE {name} histogram'] + self.samples(name)
+
+    def samples(self, name, labels=''):
+        """Sample lines without the HELP and TYPE header, for histograms that share one name across labels."""
+        prefix = labels + ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.sum}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, None when it is past the last bucket."""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= q * self.count:
+                return bound
+        return None
+
+class InputLatencyManager:
+    """Class to timestamp gameplay input and measure how long until a presented frame reflects it."""
+    KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE)  # the keys Player.handle_input reads
+
+    def __init__(self, late_latch=LATE_LATCH_INPUT):
+        self.late_latch = late_latch
+        self.last_pump = time.perf_counter()
+        self.pending = []  # arrival times of input not yet seen by a simulation step
+        self.applied = []  # arrival times of input stepped since the last snapshot
+        self.latency = Histogram(INPUT_LATENCY_BUCKETS)
+        self.worst = 0.0
+        self.last_report = time.time()
+        self.reported = 0
+        self.pressed = dict.fromkeys(self.KEYS, False)  # tracked key state as last stamped
+        self.latched = collections.Counter()  # key -> changes stamped by latch() whose events are still queued
+
+    def arrival(self):
+        """Estimated arrival time of input found by a pump happening now."""
+        # SDL event timestamps aren't exposed, so assume arrival midway since the previous pump; a
+        # stall (menu, level load) is capped at one frame so it isn't counted as latency
+        now = time.perf_counter()
+        arrival = (max(self.last_pump, now - SIMULATION_STEP) + now) / 2
+        self.last_pump = now
+        return arrival
+
+    def received(self, events):
+        """Stamp input events from a pump of the event queue."""
+        arrival = self.arrival()
+        for event in events:
+            if event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key in self.KEYS:
+                self.pressed[event.key] = event.type == pygame.KEYDOWN
+                if self.latched[event.key]:
+                    self.latched[event.key] -= 1  # Already stamped when latch() saw the key change
+                else:
+                    self.pending.append(arrival)
+
+    def latch(self):
+        """Pump once more so the key state the player reads is as fresh as possible."""
+        # The queue is left as it is for handle_events; changes to the tracked keys are read from
+        # the key state instead, and their events are skipped when they reach received()
+        pygame.event.pump()
+        arrival = self.arrival()
+        keys = pygame.key.get_pressed()
+        for key in self.KEYS:
+            if keys[key] != self.pressed[key]:
+                self.pressed[key] = keys[key]
+                self.latched[key] += 1
+                self.pending.append(arrival)
+
+    def step(self):
+        """Call right before the player reads the keyboard."""
+        if self.late_latch:
+            self.latch()
+        self.applied += self.pending
+        self.pending.clear()
+
+    def collect(self):
+        """Arrival times to carry in the next snapshot."""
+        inputs = tuple(self.applied)
+        self.applied.clear()
+        return inputs
+
+    def presented(self, inputs):
+        """Record latencies once the frame carrying inputs has been flipped; may run on the render thread."""
+        now = time.perf_counter()
+        for arrival in inputs:
+            latency = now - arrival
+            self.latency.observe(latency)
+            self.worst = max(self.worst, latency)
+        if time.time() - self.last_report >= INPUT_LATENCY_REPORT_INTERVAL:
+            self.report()
+
+    def report(self):
+        self.last_report = time.time()
+        if self.latency.count == self.reported:
+            return
+        self.reported = self.latency.count
+        bounds = [self.latency.quantile(q) for q in (0.5, 0.95)]
+        p50, p95 = (f'<= {bound * 1000:.1f} ms' if bound else f'> {INPUT_LATENCY_BUCKETS[-1] * 1000:.0f} ms'
+                    for bound in bounds)
+        print(f'[input] {self.latency.count} inputs, mean {self.latency.sum / self.latency.count * 1000:.1f} ms, '
+              f'p50 {p50}, p95 {p95}, worst {self.worst * 1000:.1f} ms '
+              f'({"late-latched" if self.late_latch else "sampled at frame start"})')
+
+    def close(self):
+        self.report()
+
+class GCManager:
+    """Class to keep full garbage collections out of active play and time every collection."""
+    def __init__(self, control=GC_CONTROL):
+        self.control = control
+        self.thresholds = gc.get_threshold()
+        self.playing = False
+        self.pause_start = 0
+        self.pauses = [Histogram(FRAME_TIME_BUCKETS) for _ in range(3)]  # per generation
+        self.collections = [0, 0, 0]
+        self.play_collections = [0, 0, 0]  # runs that interrupted active play
+        self.longest_play_pause = 0.0
+        gc.callbacks.append(self.on_gc)
+
+    def on_gc(self, phase, info):
+        if phase == 'start':
+            self.pause_start = time.perf_counter()
+            return
+        pause = time.perf_counter() - self.pause_start
+        generation = info['generation']
+        self.pauses[generation].observe(pause)
+        self.collections[generation] += 1
+        if self.playing:
+            self.play_collections[generation] += 1
+            self.longest_play_pause = max(self.longest_play_pause, pause)
+            if pause > GC_PAUSE_WARNING:
+                print(f'[gc] generation {generation} collection paused play for {pause * 1000:.1f} ms '
+                      f'({info["collected"]} objects collected)')
+
+    def freeze(self):
+        """Move everything loaded so far out of the collector's reach; call once startup is done."""
+        if self.control:
+            gc.collect()
+            gc.freeze()
+
+    def update(self, playing):
+        """Switch policy when play starts or stops, running the deferred full collection on the way out."""
+        if playing and not self.playing:
+            self.playing = True
+            if self.control:
+                gc.set_threshold(self.thresholds[0], self.thresholds[1], GC_PLAY_THRESHOLD)
+        elif not playing and self.playing:
+            self.idle()
+
+    def idle(self):
+        """Stop deferring and collect everything now, while a banner or menu is on screen."""
+        self.playing = False
+        if self.control:
+            gc.set_threshold(*self.thresholds)
+            gc.collect()
+
+    def close(self):
+        self.idle()
+        if self.on_gc in gc.callbacks:
+            gc.callbacks.remove(self.on_gc)
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler serving the metrics text on /metrics."""
+    metrics = None
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.metrics.expose().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the console
+
+class MetricsManager:
+    """Class to collect frame, entity, memory and GC metrics in Prometheus text format."""
+    def __init__(self, gc_manager, path=METRICS_FILE, port=METRICS_PORT, input_latency=None):
+        self.path = path
+        self.gc_manager = gc_manager
+        self.input_latency = input_latency
+        self.frame_time = Histogram(FRAME_TIME_BUCKETS)
+        self.tick_time = Histogram(FRAME_TIME_BUCKETS)
+        self.render_time = Histogram(FRAME_TIME_BUCKETS)
+        self.frames = 0
+        self.frames_skipped = 0
+        self.frames_throttled = 0
+        self.capture_dropped = 0
+        self.entities = {'platforms': 0, 'obstacles': 0, 'powerups': 0}
+        self.entity_states = {'active': 0, 'sleeping': 0}
+        self.despawned = 0
+        self.last_write = time.time()
+        self.server = None
+        if port is not None:
+            handler = type('BoundMetricsHandler', (MetricsHandler,), {'metrics': self})
+            self.server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+            threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True).start()
+
+    def record_frame(self, game, frame_time, tick_time, render_time=None):
+        self.frames += 1
+        self.frame_time.observe(frame_time)
+        self.tick_time.observe(tick_time)
+        if render_time is not None:
+            self.render_time.observe(render_time)
+        self.frames_skipped = game.pacer.skipped_total
+        self.frames_throttled = game.pacer.throttled_total
+        self.capture_dropped = game.recorder.dropped if game.recorder else 0
+        self.entities['platforms'] = len(game.platforms)
+        self.entities['obstacles'] = len(game.obstacles)
+        self.entities['powerups'] = len(game.powerups)
+        self.entity_states['active'] = game.lifecycle.active
+        self.entity_states['sleeping'] = game.lifecycle.sleeping
+        self.despawned = game.lifecycle.despawned
+        if self.path and time.time() - self.last_write >= METRICS_WRITE_INTERVAL:
+            self.write()
+
+    def rss_bytes(self):
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            if resource is None:
+                return None
+            # Peak rather than current RSS, reported in KiB on Linux and bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == 'darwin' else peak * 1024
+
+    def expose(self):
+        lines = ['# HELP rapidroll_frames_total Frames run by the game loop.',
+                 '# TYPE rapidroll_frames_total counter',
+                 f'rapidroll_frames_total {self.frames}',
+                 '# HELP rapidroll_frames_skipped_total Renders skipped because the loop was behind.',
+                 '# TYPE rapidroll_frames_skipped_total counter',
+                 f'rapidroll_frames_skipped_total {self.frames_skipped}',
+                 '# HELP rapidroll_frames_throttled_total Renders skipped by the power-saving render rate.',
+                 '# TYPE rapidroll_frames_throttled_total counter',
+                 f'rapidroll_frames_throttled_total {self.frames_throttled}',
+                 '# HELP rapidroll_capture_frames_dropped_total Captured frames dropped because the writer was behind.',
+                 '# TYPE rapidroll_capture_frames_dropped_total counter',
+                 f'rapidroll_capture_frames_dropped_total {self.capture_dropped}']
+        lines += self.frame_time.expose('rapidroll_frame_seconds', 'Time between frames.')
+        lines += self.tick_time.expose('rapidroll_tick_seconds', 'Time spent on input and simulation per frame.')
+        lines += self.render_time.expose('rapidroll_render_seconds', 'Time spent drawing and flipping per frame.')
+        if self.input_latency:
+            lines += self.input_latency.latency.expose('rapidroll_input_latency_seconds',
+                                                       'Time from a gameplay key event to the flip that shows it.')
+        collector = self.gc_manager
+        lines += ['# HELP rapidroll_gc_pause_seconds Duration of garbage collector runs by generation.',
+                  '# TYPE rapidroll_gc_pause_seconds histogram']
+        for generation, pauses in enumerate(collector.pauses):
+            lines += pauses.samples('rapidroll_gc_pause_seconds', f'generation="{generation}"')
+        lines += ['# HELP rapidroll_gc_collections_total Garbage collector runs by generation.',
+                  '# TYPE rapidroll_gc_collections_total counter']
+        lines += [f'rapidroll_gc_collections_total{{generation="{generation}"}} {count}'
+                  for generation, count in enumerate(collector.collections)]
+        lines += ['# HELP rapidroll_gc_play_collections_total Garbage collector runs that interrupted active play.',
+                  '# TYPE rapidroll_gc_play_collections_total counter']
+        lines += [f'rapidroll_gc_play_collections_total{{generation="{generation}"}} {count}'
+                  for generation, count in enumerate(collector.play_collections)]
+        lines += ['# HELP rapidroll_gc_longest_play_pause_seconds Longest garbage collector run during active play.',
+                  '# TYPE rapidroll_gc_longest_play_pause_seconds gauge',
+                  f'rapidroll_gc_longest_play_pause_seconds {collector.longest_play_pause}',
+                  '# HELP rapidroll_gc_frozen_objects Objects frozen out of collection after startup.',
+                  '# TYPE rapidroll_gc_frozen_objects gauge',
+                  f'rapidroll_gc_frozen_objects {gc.get_freeze_count()}']
+        lines += ['# HELP rapidroll_entities Live sprites per group.', '# TYPE rapidroll_entities gauge']
+        lines += [f'rapidroll_entities{{group="{group}"}} {count}' for group, count in self.entities.items()]
+        lines += ['# HELP rapidroll_entity_states Live entities updated each frame versus asleep above the screen.',
+                  '# TYPE rapidroll_entity_states gauge']
+        lines += [f'rapidroll_entity_states{{state="{state}"}} {count}' for state, count in self.entity_states.items()]
+        lines += ['# HELP rapidroll_entities_despawned_total Entities removed after scrolling out of the world.',
+                  '# TYPE rapidroll_entities_despawned_total counter',
+                  f'rapidroll_entities_despawned_total {self.despawned}']
+        rss = self.rss_bytes()
+        if rss is not None:
+            lines += ['# HELP rapidroll_resident_memory_bytes Resident set size of the process.',
+                      '# TYPE rapidroll_resident_memory_bytes gauge',
+                      f'rapidroll_resident_memory_bytes {rss}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """Atomically replace the metrics file so scrapers never see a partial write."""
+        self.last_write = time.time()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.expose())
+        os.replace(temp_path, self.path)
+
+    def close(self):
+        if self.path:
+            self.write()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+class MemoryProfiler:
+    """Class to track allocation growth across levels and fail soak runs that leak."""
+    FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ]
+
+    def __init__(self, interval=MEMORY_SNAPSHOT_INTERVAL, growth_limit=MEMORY_GROWTH_LIMIT):
+        self.interval = interval
+        self.growth_limit = growth_limit
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.baseline = self.take_snapshot()
+        self.previous = self.baseline
+        self.last_snapshot = time.time()
+        self.exceeded = False
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def tick(self, game):
+        if time.time() - self.last_snapshot >= self.interval:
+            self.checkpoint(game, 'interval')
+        return not self.exceeded
+
+    def checkpoint(self, game, reason):
+        """Report allocation growth by call site and sprite counts, flagging growth past the limit."""
+        self.last_snapshot = time.time()
+        snapshot = self.take_snapshot()
+        total = sum(stat.size for stat in snapshot.statistics('filename'))
+        baseline_total = sum(stat.size for stat in self.baseline.statistics('filename'))
+        growth = total - baseline_total
+        print(f'[memory] {reason} (level {game.level}): {total / 1024:.1f} KiB traced, '
+              f'{growth / 1024:+.1f} KiB since start')
+        print(f'[memory] sprites: all={len(game.all_sprites)} platforms={len(game.platforms)} '
+              f'obstacles={len(game.obstacles)} powerups={len(game.powerups)} '
+              f'active={game.lifecycle.active} sleeping={game.lifecycle.sleeping}')
+        for stat in snapshot.compare_to(self.previous, 'lineno')[:MEMORY_REPORT_TOP]:
+            if stat.size_diff:
+                print(f'[memory]   {stat}')
+        self.previous = snapshot
+        if growth > self.growth_limit:
+            print(f'[memory] growth of {growth / 1024:.1f} KiB exceeds the {self.growth_limit / 1024:.1f} KiB limit')
+            self.exceeded = True
+
+    def close(self):
+        tracemalloc.stop()
+
+class FrameRecorder:
+    """Class to capture rendered frames into preallocated buffers and write them on a background thread."""
+    MAGIC = b'RRCV'
+    VERSION = 1
+    HEADER = struct.Struct('<4sBHHB4I')  # magic, version, width, height, bytes per pixel, RGBA masks
+    INDEX = struct.Struct('<IQd')  # frame number, offset in the raw file, seconds since the capture started
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    RGB_MASKS = (0xff, 0xff00, 0xff0000, 0)  # R, G, B byte order in memory, as PNG stores it
+
+    def __init__(self, size=None, fmt=CAPTURE_FORMAT, buffers=CAPTURE_BUFFERS, interval=CAPTURE_INTERVAL):
+        size = size or WINDOW_SIZE
+        self.size = size
+        self.fmt = fmt
+        self.interval = interval
+        if fmt == 'png':
+            self.free = collections.deque(pygame.Surface(size, 0, 24, self.RGB_MASKS) for _ in range(buffers))
+        else:
+            self.free = collections.deque(pygame.Surface(size, 0, 32) for _ in range(buffers))
+        self.pending = collections.deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.frames = 0  # rendered frames offered for capture
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self.reported_drops = 0
+        self.last_report = 0
+        self.start_time = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        os.makedirs(CAPTURE_DIR, exist_ok=True)
+        if fmt == 'png':
+            self.path = os.path.join(CAPTURE_DIR, stamp)
+            os.makedirs(self.path, exist_ok=True)
+        else:
+            self.path = os.path.join(CAPTURE_DIR, stamp + '.raw')
+            self.raw_file = open(self.path, 'wb')
+            self.index_file = open(os.path.join(CAPTURE_DIR, stamp + '.idx'), 'wb')
+            sample = self.free[0]
+            self.index_file.write(self.HEADER.pack(self.MAGIC, self.VERSION, size[0], size[1],
+                                                   sample.get_bytesize(), *sample.get_masks()))
+            self.frame_bytes = sample.get_pitch() * size[1]
+        self.thread = threading.Thread(target=self.write_loop, name='capture', daemon=True)
+        self.thread.start()
+
+    def acquire(self):
+        """Return a free buffer for this frame, or None when it is skipped or the writer is behind."""
+        self.frames += 1
+        if (self.frames - 1) % self.interval:
+            return None
+        with self.condition:
+            if self.free:
+                return self.free.popleft()
+        self.dropped += 1
+        if time.time() - self.last_report >= CAPTURE_REPORT_INTERVAL:
+            print(f'Capture writer is behind: {self.dropped - self.reported_drops} frames dropped '
+                  f'({self.dropped} in total)')
+            self.reported_drops = self.dropped
+            self.last_report = time.time()
+        return None
+
+    def submit(self, buffer):
+        with self.condition:
+            self.pending.append((buffer, self.captured, time.time() - self.start_time))
+            self.captured += 1
+            self.condition.notify_all()
+
+    def capture(self, surface):
+        buffer = self.acquire()
+        if buffer is not None:
+            buffer.blit(surface, (0, 0))
+            self.submit(buffer)
+
+    def write_loop(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                buffer, frame, timestamp = self.pending.popleft()
+            if self.fmt == 'png':
+                self.write_png(buffer, os.path.join(self.path, f'frame_{frame:06d}.png'))
+            else:
+                # Write straight from the buffer's pixels, then record where the frame landed
+                self.raw_file.write(buffer.get_view('0'))
+                self.index_file.write(self.INDEX.pack(frame, frame * self.frame_bytes, timestamp))
+            with self.condition:
+                self.free.append(buffer)
+                self.written += 1
+
+    def write_png(self, buffer, path):
+        # Encoded here rather than with pygame.image.save, which holds the GIL and would stall the game loop
+        width, height = self.size
+        pitch = buffer.get_pitch()
+        pixels = buffer.get_view('0').raw
+        rows = b'\x00'.join(pixels[y * pitch:y * pitch + width * 3] for y in range(height))
+        with open(path, 'wb') as f:
+            f.write(self.PNG_SIGNATURE)
+            for tag, data in ((b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+                              (b'IDAT', zlib.compress(b'\x00' + rows, CAPTURE_COMPRESSION)),
+                              (b'IEND', b'')):
+                f.write(struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data)))
+
+    def close(self):
+        """Finish writing the queued frames and report what was captured."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+        if self.fmt != 'png':
+            self.raw_file.close()
+            self.index_file.close()
+        print(f'Captured {self.written} of {self.frames} frames to {self.path}, '
+              f'{self.dropped} dropped while the writer was behind')
+
+class RenderScale:
+    """Class to map game coordinates and images onto another resolution."""
+    def __init__(self, size, smooth=True):
+        self.size = tuple(size)
+        self.x = size[0] / SCREEN_WIDTH
+        self.y = size[1] / SCREEN_HEIGHT
+        self.identity = self.size == (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.transform = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        self.images = {}  # Shared sprite and background surfaces, scaled once each
+
+    def scale(self, surface):
+        if self.identity:
+            return surface
+        width, height = surface.get_size()
+        return self.transform(surface, (max(1, round(width * self.x)), max(1, round(height * self.y))))
+
+    def image(self, image):
+        scaled = self.images.get(image)
+        if scaled is None:
+            scaled = self.images[image] = self.scale(image)
+        return scaled
+
+    def sprites(self, sprites):
+        if self.identity:
+            return sprites
+        image, x, y = self.image, self.x, self.y
+        return [(image(sprite), (int(left * x), int(top * y))) for sprite, (left, top) in sprites]
+
+class SurfaceBackend:
+    """Render backend that blits snapshots straight onto the display surface."""
+    threaded = True
+
+    def __init__(self):
+        self.display = pygame.display.set_mode(WINDOW_SIZE)
         pygame.display.set_caption('Rapid Roll Clone')
+        self.world = RenderScale(RENDER_SIZE)
+        self.window = RenderScale(WINDOW_SIZE, SMOOTH_SCALING)
+        self.scaled = not (self.world.identity and self.window.identity)
+        self.recorder = None
+        if not self.scaled:
+            self.screen = self.display
+            return
+        # Menus draw at game resolution onto this surface and are scaled on present()
+        self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.target = self.display if self.world.size == self.window.size else pygame.Surface(RENDER_SIZE)
+        self.hud = pygame.Surface(HUD_SIZE, pygame.SRCALPHA)
+        self.hud_key = None
+        self.hud_image = None
+        self.overlay_key = None
+        self.overlay_image = None
+
+    def render(self, snapshot, ui_manager):
+        if self.scaled:
+            self.render_scaled(snapshot, ui_manager)
+            return
+        screen = self.screen
+        screen.blit(snapshot.background, (0, 0))
+        screen.blits(snapshot.sprites, doreturn=False)
+        ui_manager.draw(screen, snapshot.hud, snapshot.time_left)
+        if snapshot.state == 'game_over':
+            ui_manager.draw_game_over(screen, snapshot.hud.score)
+        elif snapshot.state == 'level_up':
+            ui_manager.draw_level_up(screen, snapshot.level, snapshot.banner_offset)
+        if self.recorder:
+            self.recorder.capture(screen)
+        pygame.display.flip()
+
+    def render_scaled(self, snapshot, ui_manager):
+        world, window, display = self.world, self.window, self.display
+        self.target.blit(world.image(snapshot.background), (0, 0))
+        self.target.blits(world.sprites(snapshot.sprites), doreturn=False)
+        if self.target is not display:
+            window.transform(self.target, window.size, display)
+        # The HUD and banners only change every so often, so they are redrawn and rescaled on change
+        hud_key = (snapshot.hud, int(snapshot.time_left))
+        if self.hud_key != hud_key:
+            self.hud.fill((0, 0, 0, 0))
+            ui_manager.draw(self.hud, snapshot.hud, snapshot.time_left)
+            self.hud_image = window.scale(self.hud)
+            self.hud_key = hud_key
+        display.blit(self.hud_image, (0, 0))
+        if snapshot.state in ('game_over', 'level_up'):
+            overlay_key = (snapshot.state, snapshot.hud.score if snapshot.state == 'game_over' else snapshot.level)
+            if self.overlay_key != overlay_key:
+                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+                if snapshot.state == 'game_over':
+                    ui_manager.draw_game_over(overlay, snapshot.hud.score)
+                else:
+                    ui_manager.draw_level_up(overlay, snapshot.level)
+                self.overlay_image = window.scale(overlay)
+                self.overlay_key = overlay_key
+            display.blit(self.overlay_image, (0, int(snapshot.banner_offset * window.y)))
+        if self.recorder:
+            self.recorder.capture(display)
+        pygame.display.flip()
+
+    def present(self):
+        if self.scaled:
+            if self.window.identity:
+                self.display.blit(self.screen, (0, 0))
+            else:
+                self.window.transform(self.screen, self.window.size, self.display)
+        pygame.display.flip()
+
+class TextureBackend:
+    """Render backend that draws snapshots as textures through an SDL2 Renderer."""
+    threaded = False  # SDL renderers must stay on the thread that created them
+
+    def __init__(self, software=SDL2_SOFTWARE_RENDERER):
+        # load_image still needs a display mode for convert_alpha(), so keep a hidden one around
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        # Read by SDL whenever a texture is created, including the render target below
+        os.environ['SDL_RENDER_SCALE_QUALITY'] = '1' if SMOOTH_SCALING else '0'
+        self.window = sdl2_video.Window('Rapid Roll Clone', WINDOW_SIZE)
+        self.renderer = None
+        if not software:
+            try:
+                self.renderer = sdl2_video.Renderer(self.window, accelerated=1)
+            except sdl2_video.error as e:
+                print(f"No accelerated renderer available, using software rendering: {e}")
+        if self.renderer is None:
+            self.renderer = sdl2_video.Renderer(self.window, accelerated=0)
+        # Menus and banners draw onto this surface, which is uploaded whole on present()
+        self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.screen_texture = sdl2_video.Texture(self.renderer, self.screen.get_size(), streaming=True)
+        self.hud = pygame.Surface(HUD_SIZE, pygame.SRCALPHA)
+        self.hud_texture = sdl2_video.Texture(self.renderer, HUD_SIZE, streaming=True)
+        self.hud_texture.blend_mode = 1  # SDL_BLENDMODE_BLEND
+        # The world is drawn into a RENDER_SIZE target texture that the GPU scales to the window
+        self.world = RenderScale(RENDER_SIZE)
+        self.window_scale = RenderScale(WINDOW_SIZE)
+        self.target = None
+        if self.world.size != self.window_scale.size:
+            self.target = sdl2_video.Texture(self.renderer, RENDER_SIZE, target=True)
+        self.hud_rect = (0, 0, round(HUD_SIZE[0] * self.window_scale.x), round(HUD_SIZE[1] * self.window_scale.y))
+        self.textures = {}  # Shared sprite and background surfaces, uploaded once each
+        self.game_over_score = None
+        self.game_over_texture = None
+        self.level_up_level = None
+        self.level_up_texture = None
+        self.recorder = None
+
+    def texture(self, image):
+        texture = self.textures.get(image)
+        if texture is None:
+            texture = self.textures[image] = sdl2_video.Texture.from_surface(self.renderer, image)
+        return texture
+
+    def render(self, snapshot, ui_manager):
+        texture, world = self.texture, self.world
+        if self.target:
+            self.renderer.target = self.target
+        texture(world.image(snapshot.background)).draw()
+        for image, position in world.sprites(snapshot.sprites):
+            texture(image).draw(dstrect=position)
+        if self.target:
+            self.renderer.target = None
+            self.target.draw()
+        self.hud.fill((0, 0, 0, 0))
+        ui_manager.draw(self.hud, snapshot.hud, snapshot.time_left)
+        self.hud_texture.update(self.hud)
+        self.hud_texture.draw(dstrect=self.hud_rect)
+        if snapshot.state == 'game_over':
+            if self.game_over_score != snapshot.hud.score:
+                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+                ui_manager.draw_game_over(overlay, snapshot.hud.score)
+                self.game_over_texture = sdl2_video.Texture.from_surface(self.renderer, overlay)
+                self.game_over_score = snapshot.hud.score
+            self.game_over_texture.draw()
+        elif snapshot.state == 'level_up':
+            if self.level_up_level != snapshot.level:
+                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+                ui_manager.draw_level_up(overlay, snapshot.level)
+                self.level_up_texture = sdl2_video.Texture.from_surface(self.renderer, overlay)
+                self.level_up_level = snapshot.level
+            self.level_up_texture.draw(dstrect=(0, int(snapshot.banner_offset * self.window_scale.y)) + self.window_scale.size)
+        if self.recorder:
+            # Read back before present(), after which the back buffer is undefined
+            buffer = self.recorder.acquire()
+            if buffer is not None:
+                self.renderer.to_surface(buffer)
+                self.recorder.submit(buffer)
+        self.renderer.present()
+
+    def present(self):
+        self.screen_texture.update(self.screen)
+        self.screen_texture.draw()
+        self.renderer.present()
+
+def create_render_backend(backend=RENDER_BACKEND):
+    """Create the configured render backend, falling back to Surface blits without pygame._sdl2."""
+    if backend == 'sdl2':
+        if sdl2_video is not None:
+            return TextureBackend()
+        print("pygame._sdl2 is not available, using the Surface render backend")
+    return SurfaceBackend()
+
+class AliasTable:
+    """Class to draw weighted choices in constant time with Vose's alias method."""
+    def __init__(self, weights):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1 - scaled[low]
+            (small if scaled[high] < 1 else large).append(high)
+        # Whatever is left over is 1 give or take rounding and keeps its probability of 1
+
+    def draw(self, rng):
+        index = rng.randrange(len(self.alias))
+        return index if rng.random() < self.probability[index] else self.alias[index]
+
+class SpawnDirector:
+    """Class to draw spawns from preshuffled per-level batches within the level's difficulty budget."""
+    def __init__(self, rng, batch_size=SPAWN_BATCH_SIZE):
+        self.rng = rng
+        self.batch_size = batch_size
+        self.level = 1
+        self.tables = {}  # (level, group) -> (weights, AliasTable), dropped when the data file reloads
+        self.data_mtime = GAME_DATA.mtime
+        self.batches = [[], [], []]  # indexed by LEVEL_PLATFORMS, LEVEL_OBSTACLES, LEVEL_POWERUPS
+
+    def reset(self, level):
+        self.level = level
+        for batch in self.batches:
+            batch.clear()
+
+    def table(self, group):
+        if self.data_mtime != GAME_DATA.mtime:
+            self.tables.clear()
+            self.data_mtime = GAME_DATA.mtime
+        key = (self.level, group)
+        entry = self.tables.get(key)
+        if entry is None:
+            weights = GAME_DATA.spawn_weights(group, self.level)
+            if not any(weights):
+                weights = [1.0] * len(weights)  # A curve tuned down to nothing falls back to uniform
+            entry = self.tables[key] = (weights, AliasTable(weights))
+        return entry
+
+    def refill(self, group):
+        """Give each choice its whole share of a batch, draw the fractional rest, then shuffle."""
+        weights, table = self.table(group)
+        total = sum(weights)
+        batch = self.batches[group]
+        for index, weight in enumerate(weights):
+            batch += [index] * int(weight * self.batch_size / total)
+        while len(batch) < self.batch_size:
+            batch.append(table.draw(self.rng))
+        self.rng.shuffle(batch)
+
+    def peek(self, group):
+        batch = self.batches[group]
+        if not batch:
+            self.refill(group)
+        return batch[-1]
+
+    def platform(self, platforms):
+        """(moving, disappearing) for the next platform, always safe while too few safe ones are ahead."""
+        safe = sum(1 for platform in platforms
+                   if not (platform.moving or platform.disappearing) and LifecycleManager.ahead(platform))
+        if safe < GAME_DATA.safe_platforms(self.level):
+            return False, False
+        batch = self.batches[LEVEL_PLATFORMS]
+        if not batch:
+            self.refill(LEVEL_PLATFORMS)
+        kind = batch.pop()
+        return bool(kind & 1), bool(kind & 2)
+
+    def obstacle(self, obstacles):
+        """Type of the next obstacle, or None while the hazards within a screen use up the budget."""
+        type_id = self.peek(LEVEL_OBSTACLES)
+        costs = GAME_DATA.obstacle_costs
+        load = sum(costs[obstacle.type_id] for obstacle in obstacles if obstacle.rect.bottom > -SCREEN_HEIGHT)
+        if load + costs[type_id] > GAME_DATA.hazard_budget(self.level):
+            return None  # Stays next in line, so expensive hazards aren't skipped for cheap ones
+        self.batches[LEVEL_OBSTACLES].pop()
+        return OBSTACLE_TYPES[type_id]
+
+    def powerup(self):
+        batch = self.batches[LEVEL_POWERUPS]
+        if not batch:
+            self.refill(LEVEL_POWERUPS)
+        return POWERUP_TYPES[batch.pop()]
+
+class LevelBuilder:
+    """Class to build a level's sprites a few at a time so generation never stalls a frame."""
+    def __init__(self, level, rng, director):
+        self.level = level
+        self.rng = rng
+        self.director = director
+        self.platforms = []
+        self.obstacles = []
+        self.powerups = []
+        self.done = False
+        self.pending = self.build()
+
+    def build(self):
+        rng = self.rng
+        director = self.director
+        director.reset(self.level)
+        # Generate platforms
+        for i in range(GAME_DATA.level_count(LEVEL_PLATFORMS, self.level)):
+            x = rng.randint(0, SCREEN_WIDTH - PLATFORM_WIDTH)
+            y = rng.randint(0, SCREEN_HEIGHT - PLATFORM_HEIGHT)
+            moving, disappearing = director.platform(self.platforms)
+            self.platforms.append(Platform(x, y, moving=moving, disappearing=disappearing))
+            yield
+        # Generate obstacles until the count or the hazard budget runs out
+        for i in range(GAME_DATA.level_count(LEVEL_OBSTACLES, self.level)):
+            obstacle_type = director.obstacle(self.obstacles)
+            if obstacle_type is None:
+                break
+            x = rng.randint(0, SCREEN_WIDTH - OBSTACLE_SIZE)
+            y = rng.randint(-300, -40)
+            self.obstacles.append(Obstacle(x, y, obstacle_type, rng))
+            yield
+        # Generate power-ups
+        for i in range(GAME_DATA.level_count(LEVEL_POWERUPS, self.level)):
+            x = rng.randint(0, SCREEN_WIDTH - POWERUP_SIZE)
+            y = rng.randint(-300, -40)
+            self.powerups.append(PowerUp(x, y, director.powerup()))
+            yield
+
+    def step(self, budget=LEVEL_BUILD_BUDGET):
+        for _ in range(budget):
+            try:
+                next(self.pending)
+            except StopIteration:
+                self.done = True
+                return
+
+    def finish(self):
+        while not self.done:
+            self.step()
+
+class LifecycleManager:
+    """Class to keep only the sprites in the active band updated and drawn, despawning those that leave the world."""
+    def __init__(self):
+        self.sprites = pygame.sprite.Group()  # The player and every awake entity, in draw order
+        self.platforms = pygame.sprite.Group()
+        self.obstacles = pygame.sprite.Group()
+        self.powerups = pygame.sprite.Group()
+        self.sleeping = 0
+        self.despawned = 0
+
+    @property
+    def active(self):
+        return len(self.platforms) + len(self.obstacles) + len(self.powerups)
+
+    def reset(self, game):
+        for group in (self.sprites, self.platforms, self.obstacles, self.powerups):
+            group.empty()
+        self.sprites.add(game.player)
+        self.refresh(game)
+
+    def refresh(self, game):
+        """Wake sprites that entered the active band, put the rest to sleep and despawn the ones below the world."""
+        # Sprites only change band when the world scrolls or something spawns, so this isn't needed every frame
+        top = -ACTIVE_MARGIN
+        bottom = SCREEN_HEIGHT + DESPAWN_MARGIN
+        sleeping = 0
+        for group, active in ((game.platforms, self.platforms), (game.obstacles, self.obstacles), (game.powerups, self.powerups)):
+            for sprite in group.sprites():
+                if sprite.rect.top > bottom:
+                    sprite.kill()
+                    self.despawned += 1
+                elif sprite.rect.bottom < top and not self.enters_from_above(sprite):
+                    if sprite in active:
+                        active.remove(sprite)
+                        self.sprites.remove(sprite)
+                    sleeping += 1
+                elif sprite not in active:
+                    active.add(sprite)
+                    self.sprites.add(sprite)
+        self.sleeping = sleeping
+
+    @staticmethod
+    def ahead(sprite):
+        """On screen or still above it; sprites below the screen only scroll further away before despawning."""
+        return sprite.rect.top < SCREEN_HEIGHT
+
+    @staticmethod
+    def enters_from_above(sprite):
+        # Falling obstacles move into view on their own, so they have to keep updating
+        return isinstance(sprite, Obstacle) and GAME_DATA.obstacle_behaviours[sprite.type_id] is obstacle_fall
+
+class ParticleSystem:
+    """Class to simulate particles in preallocated arrays and draw them from pre-tinted sprites."""
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        self.enabled = np is not None
+        self.count = 0  # Live particles are kept packed at the front of the arrays
+        self.emitted = 0  # Particles emitted this frame, against PARTICLE_EMIT_BUDGET
+        self.dropped = 0
+        self.styles = {name: index for index, name in enumerate(PARTICLE_STYLES)}
+        self.sprites = []
+        for color, size, gravity, life in PARTICLE_STYLES.values():
+            fades = []
+            for step in range(1, PARTICLE_FADE_STEPS + 1):
+                sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+                pygame.draw.circle(sprite, (*color, 255 * step // PARTICLE_FADE_STEPS), (size // 2, size // 2), size // 2)
+                fades.append(sprite)
+            self.sprites.append(fades)
+        if not self.enabled:
+            return
+        self.rng = np.random.default_rng()
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.ay = np.zeros(capacity, np.float32)
+        self.life = np.zeros(capacity, np.float32)
+        self.max_life = np.ones(capacity, np.float32)
+        self.kind = np.zeros(capacity, np.intp)
+        # Flat object table indexed by kind * PARTICLE_FADE_STEPS + fade level
+        self.sprite_table = np.empty(len(self.sprites) * PARTICLE_FADE_STEPS, object)
+        self.sprite_table[:] = [sprite for fades in self.sprites for sprite in fades]
+
+    def emit(self, style, position, count, speed=3.0):
+        """Spawn up to count particles bursting from position, within the capacity and frame budget."""
+        if not self.enabled:
+            return
+        count = min(count, len(self.x) - self.count, PARTICLE_EMIT_BUDGET - self.emitted)
+        if count <= 0:
+            self.dropped += 1
+            return
+        kind = self.styles[style]
+        color, size, gravity, life = PARTICLE_STYLES[style]
+        start, end = self.count, self.count + count
+        angle = self.rng.uniform(0, 2 * math.pi, count)
+        velocity = self.rng.uniform(0.2, 1.0, count) * speed
+        self.x[start:end] = position[0] - size / 2
+        self.y[start:end] = position[1] - size / 2
+        self.vx[start:end] = np.cos(angle) * velocity
+        self.vy[start:end] = np.sin(angle) * velocity
+        self.ay[start:end] = gravity
+        self.life[start:end] = self.rng.uniform(life / 2, life, count)
+        self.max_life[start:end] = self.life[start:end]
+        self.kind[start:end] = kind
+        self.count = end
+        self.emitted += count
+
+    def shift(self, dy):
+        """Move every particle with the scrolling world."""
+        if self.count:
+            self.y[:self.count] += dy
+
+    def update(self):
+        self.emitted = 0
+        n = self.count
+        if not n:
+            return
+        self.vy[:n] += self.ay[:n]
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 1
+        alive = self.life[:n] > 0
+        kept = int(np.count_nonzero(alive))
+        if kept < n:
+            for values in (self.x, self.y, self.vx, self.vy, self.ay, self.life, self.max_life, self.kind):
+                values[:kept] = values[:n][alive]
+        self.count = kept
+
+    def blits(self):
+        """Return (sprite, position) pairs for the live particles, thinned out past the draw budget."""
+        n = self.count
+        if not n:
+            return ()
+        step = -(-n // PARTICLE_DRAW_BUDGET)  # Draw every step-th particle when over budget
+        fade = (self.life[:n:step] * (PARTICLE_FADE_STEPS - 1) / self.max_life[:n:step]).astype(np.intp)
+        sprites = self.sprite_table[self.kind[:n:step] * PARTICLE_FADE_STEPS + fade].tolist()
+        positions = zip(self.x[:n:step].astype(np.int32).tolist(), self.y[:n:step].astype(np.int32).tolist())
+        return tuple(zip(sprites, positions))
+
+class Game:
+    """Main game class."""
+    def __init__(self, seed=None, headless=False):
+        # Headless games simulate without a window, sound or the live-only subsystems, for bots
+        self.headless = headless
+        self.backend = None if headless else create_render_backend()
+        self.screen = None if headless else self.backend.screen
+        # Render the animation strips up front rather than on the first spawn
+        for obstacle_type, (style, rate) in OBSTACLE_ANIMATIONS.items():
+            load_frames(OBSTACLE_IMAGES[obstacle_type], OBSTACLE_SIZE, OBSTACLE_SIZE, style)
         self.clock = pygame.time.Clock()
         self.running = True
+        self.rng = random.Random(seed)  # Every random choice in the simulation comes from here
+        self.spawn_director = SpawnDirector(self.rng)
+        self.now = 0.0  # Game time in seconds, advanced by SIMULATION_STEP per update
         self.level = 1
         self.time_left = 120  # seconds per level
-        self.start_time = time.time()
+        self.start_time = self.now
         self.all_sprites = pygame.sprite.Group()
         self.platforms = pygame.sprite.Group()
         self.obstacles = pygame.sprite.Group()
         self.powerups = pygame.sprite.Group()
-        self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, self)
+        self.lifecycle = LifecycleManager()
         self.ui_manager = UIManager()
         self.high_score_manager = HighScoreManager()
         self.backgrounds = [load_image(bg, SCREEN_WIDTH, SCREEN_HEIGHT) for bg in BACKGROUND_IMAGES]
         self.background = self.backgrounds[0]
+        self.pipeline = None
+        self.save_state_manager = SaveStateManager()
+        self.spectator_stream = SpectatorStream() if SPECTATOR_STREAM and not headless else None
+        self.gc_manager = None if headless else GCManager()
+        self.input_latency = InputLatencyManager(LATE_LATCH_INPUT) if INPUT_LATENCY_TRACKING and not headless else None
+        self.metrics = (MetricsManager(self.gc_manager, input_latency=self.input_latency)
+                        if METRICS_ENABLED and not headless else None)
+        self.memory_profiler = MemoryProfiler() if MEMORY_PROFILING and not headless else None
+        self.recorder = FrameRecorder() if CAPTURE_ENABLED and not headless else None
+        if self.backend:
+            self.backend.recorder = self.recorder
+        self.pacer = FramePacer()
+        self.exit_status = 0
+        self.save_on_exit = False  # Set by Q, in play or in the pause menu
+        self.level_builder = None
+        self.transition_end = 0
+        self.particles = ParticleSystem(0 if headless else PARTICLE_CAPACITY)
+        # Assets, caches and subsystems live for the whole run; levels are built after the freeze
+        if self.gc_manager:
+            self.gc_manager.freeze()
         self.generate_level()
         self.state = 'playing'
 
     def generate_level(self):
+        builder = LevelBuilder(self.level, self.rng, self.spawn_director)
+        builder.finish()
+        self.install_level(builder)
+
+    def install_level(self, builder):
         self.all_sprites.empty()
         self.platforms.empty()
         self.obstacles.empty()
         self.powerups.empty()
-        self.all_sprites.add(self.player)
-        # Generate platforms
-        for i in range(10 + self.level * 2):
-            x = random.randint(0, SCREEN_WIDTH - PLATFORM_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT - PLATFORM_HEIGHT)
-            moving = random.choice([True, False])
-            disappearing = random.choice([True, False])
-            platform = Platform(x, y, moving=moving, disappearing=disappearing)
-            self.all_sprites.add(platform)
-            self.platforms.add(platform)
-        # Generate obstacles
-        for i in range(5 + self.level):
-            x = random.randint(0, SCREEN_WIDTH - OBSTACLE_SIZE)
-            y = random.randint(-300, -40)
-            obstacle_type = random.choice(list(OBSTACLE_IMAGES.keys()))
-            obstacle = Obstacle(x, y, obstacle_type)
-            self.all_sprites.add(obstacle)
-            self.obstacles.add(obstacle)
-        # Generate power-ups
-        for i in range(3):
-            x = random.randint(0, SCREEN_WIDTH - POWERUP_SIZE)
-            y = random.randint(-300, -40)
-            power_type = random.choice(list(POWERUP_IMAGES.keys()))
-            powerup = PowerUp(x, y, power_type)
-            self.all_sprites.add(powerup)
-            self.powerups.add(powerup)
+        self.all_sprites.add(self.player, *builder.platforms, *builder.obstacles, *builder.powerups)
+        self.platforms.add(*builder.platforms)
+        self.obstacles.add(*builder.obstacles)
+        self.powerups.add(*builder.powerups)
+        self.lifecycle.reset(self)
+        if self.memory_profiler:
+            self.memory_profiler.checkpoint(self, 'level start')
 
     def run(self):
+        if PIPELINED_RENDERING and self.backend.threaded:
+            self.pipeline = RenderPipeline(self.render)
+        self.pacer = FramePacer()
         while self.running:
-            self.clock.tick(FPS)
+            self.pacer.wait()
+            GAME_DATA.poll()
+            tick_start = time.perf_counter()
             self.handle_events()
+            if not self.running:
+                break  # Quit during input; the save below holds the state the player saw
+            tick_start = max(tick_start, self.pacer.resumed)  # Time in the pause menu isn't tick time
             self.update()
-            self.draw()
+            self.gc_manager.update(self.state == 'playing')
+            if self.spectator_stream:
+                self.spectator_stream.publish(self)
+            render_start = time.perf_counter()
+            self.pacer.record_update(render_start - tick_start)
+            render_time = None
+            if self.pacer.should_render():
+                self.draw()
+                render_time = time.perf_counter() - render_start
+                self.pacer.record_render(render_time)
+            if self.metrics:
+                self.metrics.record_frame(self, self.pacer.frame_time, render_start - tick_start, render_time)
+            if self.memory_profiler and not self.memory_profiler.tick(self):
+                self.exit_status = 1
+                self.running = False
+        if self.save_on_exit:
+            self.save_game()
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.spectator_stream:
+            self.spectator_stream.close()
+        if self.metrics:
+            self.metrics.close()
+        self.gc_manager.close()
+        if self.memory_profiler:
+            self.memory_profiler.close()
+        if self.recorder:
+            self.recorder.close()
+        if self.input_latency:
+            self.input_latency.close()
+        if self.pacer.skipped_total or self.pacer.throttled_total:
+            print(f'Rendered {self.pacer.rendered_total} frames, skipped {self.pacer.skipped_total} '
+                  f'while behind and {self.pacer.throttled_total} to save power')
         pygame.quit()
-        sys.exit()
+        sys.exit(self.exit_status)
 
-    def update(self):
+    def update(self, action=None):
+        self.now += SIMULATION_STEP
+        self.particles.update()
         if self.state == 'playing':
-            self.player.update(self.platforms)
-            self.platforms.update()
-            self.obstacles.update()
-            self.powerups.update()
+            lifecycle = self.lifecycle
+            if self.input_latency and action is None:
+                self.input_latency.step()
+            self.player.update(lifecycle.platforms, action)
+            lifecycle.platforms.update(self.player.contacts.ground, self.now)
+            lifecycle.obstacles.update()
+            lifecycle.powerups.update()
             self.check_collisions()
+            self.emit_trails()
             self.update_time()
             self.update_background()
             self.spawn_platforms_and_obstacles()
             if self.player.lives <= 0:
                 self.state = 'game_over'
+                if not self.headless:
+                    self.save_state_manager.discard()  # The run is over, don't offer an older one to continue
+        elif self.state == 'level_up':
+            self.update_level_transition()
+
+    def update_level_transition(self):
+        """Build the next level during the banner and switch to it once the banner ends."""
+        if self.level_builder is None:
+            self.level_builder = LevelBuilder(self.level, self.rng, self.spawn_director)
+        self.level_builder.step()
+        if self.headless or self.now >= self.transition_end:
+            self.finish_level_transition()
+
+    def finish_level_transition(self):
+        if self.level_builder is None:
+            self.level_builder = LevelBuilder(self.level, self.rng, self.spawn_director)
+        self.level_builder.finish()
+        self.install_level(self.level_builder)
+        self.level_builder = None
+        self.start_time = self.now  # The banner doesn't eat into the new level's time
+        self.state = 'playing'
+
+    def save_game(self):
+        """Write the save for 'Continue'; a level transition is finished first so the save starts the new level."""
+        if self.state == 'level_up':
+            self.finish_level_transition()
+        if self.state == 'playing':
+            self.save_state_manager.save(self)
 
     def spawn_platforms_and_obstacles(self):
         # Check if the player is near the top of the screen and spawn new platforms and obstacles
@@ -415,21 +2438,27 @@ class Game:
             # Adjust all sprites downwards to simulate upward movement
             for sprite in self.all_sprites:
                 sprite.rect.y += PLAYER_SPEED
+            self.particles.shift(PLAYER_SPEED)
 
             # Generate new platforms and obstacles at the top of the screen
-            if len(self.platforms) < 10 + self.level * 2:
-                x = random.randint(0, SCREEN_WIDTH - PLATFORM_WIDTH)
-                y = random.randint(-PLATFORM_HEIGHT, 0)
-                platform = Platform(x, y, moving=random.choice([True, False]), disappearing=random.choice([True, False]))
+            if len(self.platforms) < GAME_DATA.level_count(LEVEL_PLATFORMS, self.level):
+                x = self.rng.randint(0, SCREEN_WIDTH - PLATFORM_WIDTH)
+                y = self.rng.randint(-PLATFORM_HEIGHT, 0)
+                moving, disappearing = self.spawn_director.platform(self.platforms)
+                platform = Platform(x, y, moving=moving, disappearing=disappearing)
                 self.all_sprites.add(platform)
                 self.platforms.add(platform)
 
-            if len(self.obstacles) < 5 + self.level:
-                x = random.randint(0, SCREEN_WIDTH - OBSTACLE_SIZE)
-                y = random.randint(-OBSTACLE_SIZE, 0)
-                obstacle = Obstacle(x, y, random.choice(list(OBSTACLE_IMAGES.keys())))
-                self.all_sprites.add(obstacle)
-                self.obstacles.add(obstacle)
+            if len(self.obstacles) < GAME_DATA.level_count(LEVEL_OBSTACLES, self.level):
+                obstacle_type = self.spawn_director.obstacle(self.obstacles)
+                if obstacle_type:
+                    x = self.rng.randint(0, SCREEN_WIDTH - OBSTACLE_SIZE)
+                    y = self.rng.randint(-OBSTACLE_SIZE, 0)
+                    obstacle = Obstacle(x, y, obstacle_type, self.rng)
+                    self.all_sprites.add(obstacle)
+                    self.obstacles.add(obstacle)
+
+            self.lifecycle.refresh(self)
 
     def update_background(self):
         # Change background based on the player's height (y-position)
@@ -442,90 +2471,165 @@ class Game:
         else:
             self.background = self.backgrounds[0]  # Default background
 
+    def snapshot(self):
+        """Capture everything needed to draw the current frame."""
+        player = self.player
+        banner_offset = 0
+        if self.state == 'level_up':
+            # Slide the banner in from above during the first fifth of the transition
+            remaining = max(0.0, self.transition_end - self.now) / LEVEL_UP_BANNER_TIME
+            banner_offset = -int(max(0.0, remaining - 0.8) * 5 * SCREEN_HEIGHT // 2)
+        return FrameSnapshot(
+            self.background,
+            tuple((sprite.image, sprite.rect.topleft) for sprite in self.lifecycle.sprites) + self.particles.blits(),
+            HudState(player.lives, player.score, player.shielded, player.double_score),
+            self.time_left,
+            self.state,
+            self.level,
+            banner_offset,
+            self.input_latency.collect() if self.input_latency else (),
+        )
+
     def draw(self):
-        self.screen.blit(self.background, (0, 0))
-        self.all_sprites.draw(self.screen)
-        self.ui_manager.draw(self.screen, self.player, self.time_left)
-        if self.state == 'game_over':
-            self.ui_manager.draw_game_over(self.screen, self.player.score)
-        pygame.display.flip()
+        if self.pipeline:
+            self.pipeline.submit(self.snapshot())
+        else:
+            self.render(self.snapshot())
+
+    def render(self, snapshot):
+        self.backend.render(snapshot, self.ui_manager)
+        if snapshot.inputs:
+            self.input_latency.presented(snapshot.inputs)
+
+    def wait_for_render(self):
+        """Hand the screen back to the caller before drawing outside the main loop."""
+        if self.pipeline:
+            self.pipeline.sync()
 
     def handle_events(self):
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        if self.input_latency and self.state == 'playing':
+            self.input_latency.received(events)
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_p:
+                    self.wait_for_render()
                     self.pause_menu()
                 elif event.key == pygame.K_q:
+                    self.save_on_exit = True
                     self.running = False
                 elif event.key == pygame.K_r:
                     self.reset_game()
 
-    def reset_game(self):
+    def reset_game(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
         self.level = 1
         self.time_left = 120
-        self.start_time = time.time()
-        self.player.lives = 3
-        self.player.score = 0
+        self.now = 0.0  # Restart the clock too, so a seed replays identically
+        self.start_time = self.now
+        self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, self)
+        self.background = self.backgrounds[0]
+        self.level_builder = None
         self.generate_level()
         self.state = 'playing'
 
     def check_collisions(self):
         # Check obstacle collisions
-        hits = pygame.sprite.spritecollide(self.player, self.obstacles, False)
+        hits = pygame.sprite.spritecollide(self.player, self.lifecycle.obstacles, False, collide_swept)
         for hit in hits:
             if not self.player.shielded:
                 self.player.lives -= 1
                 hit.kill()  # Remove the obstacle that collided with the player
+                if hit.type == 'bomb':
+                    self.particles.emit('explosion', hit.rect.center, 120, speed=6)
+                else:
+                    self.particles.emit('debris', hit.rect.center, 30)
+            else:
+                self.particles.emit('shield', hit.rect.center, 8)
 
         # Check power-up collisions
-        hits = pygame.sprite.spritecollide(self.player, self.powerups, True)
+        hits = pygame.sprite.spritecollide(self.player, self.lifecycle.powerups, True, collide_swept)
         for hit in hits:
+            self.particles.emit('star' if hit.type == 'bonus_star' else 'pickup', hit.rect.center, 40)
             self.player.power_up(hit.type)
             self.player.score += 50 if not self.player.double_score else 100
 
         # Increase score over time
         self.player.score += 1 if not self.player.double_score else 2
 
+    def emit_trails(self):
+        for obstacle in self.lifecycle.obstacles:
+            if obstacle.type_id == FIREBALL_TYPE_ID and obstacle.rect.bottom > 0:
+                self.particles.emit('trail', obstacle.rect.midtop, 2, speed=1)
+
+    def menu_loop(self, handle_event, draw, duration=None):
+        """Sleep on input, redrawing only after events that can change what the menu shows.
+
+        handle_event returns True to close the menu; QUIT always closes it and stops the game.
+        With a duration the menu also closes by itself once that many seconds have passed.
+        """
+        deadline = None if duration is None else time.time() + duration
+        redraw = True
+        collect = True
+        while True:
+            if redraw:
+                draw()
+                self.backend.present()
+                if collect:
+                    self.gc_manager.idle()  # Run the deferred collection once the menu is on screen
+                    collect = False
+            timeout = MENU_IDLE_TIMEOUT
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+                timeout = min(timeout, int(remaining * 1000) + 1)
+            event = pygame.event.wait(timeout)
+            if event.type == pygame.NOEVENT:
+                redraw = False
+                continue
+            if event.type == pygame.QUIT:
+                self.running = False
+                return
+            if handle_event(event):
+                return
+            redraw = event.type in MENU_REDRAW_EVENTS
+
     def pause_menu(self):
-        paused = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        while paused:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        def handle_event(event):
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    return True
+                elif event.key == pygame.K_q:
+                    self.save_on_exit = True
                     self.running = False
-                    paused = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        paused = False
-                    elif event.key == pygame.K_q:
-                        paused = False
-                        self.running = False
+                    return True
+
+        def draw():
             self.screen.fill(GRAY)
-            pause_text = font.render('Game Paused', True, WHITE)
-            resume_text = font.render('Press R to Resume', True, WHITE)
-            quit_text = font.render('Press Q to Quit', True, WHITE)
-            self.screen.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            self.screen.blit(resume_text, (SCREEN_WIDTH // 2 - resume_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(quit_text, (SCREEN_WIDTH // 2 - quit_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
+            self.ui_manager.draw_centered(self.screen, 'Game Paused', SCREEN_HEIGHT // 2 - 50)
+            self.ui_manager.draw_centered(self.screen, 'Press R to Resume', SCREEN_HEIGHT // 2)
+            self.ui_manager.draw_centered(self.screen, 'Press Q to Quit', SCREEN_HEIGHT // 2 + 50)
+
+        self.menu_loop(handle_event, draw)
+        self.pacer.resume()
 
     def update_time(self):
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = self.now - self.start_time
         self.time_left -= elapsed_time
-        self.start_time = time.time()
+        self.start_time = self.now
         if self.time_left <= 0:
             self.level_up()
 
     def level_up(self):
         self.level += 1
         self.time_left = 120
-        self.generate_level()
-        self.ui_manager.draw_level_up(self.screen, self.level)
-        pygame.display.flip()
-        pygame.time.delay(2000)
+        self.state = 'level_up'
+        self.transition_end = self.now + LEVEL_UP_BANNER_TIME
+        self.level_builder = LevelBuilder(self.level, self.rng, self.spawn_director)
     def game_over(self):
         self.running = False
         name = self.get_player_name()
@@ -534,642 +2638,288 @@ class Game:
 
     def get_player_name(self):
         name = ''
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
         input_box = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2, 200, 30)
-        active = True
-        while active:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    active = False
-                    self.running = False
-                    return 'Player'
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        active = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        name = name[:-1]
-                    else:
-                        name += event.unicode
+
+        def handle_event(event):
+            nonlocal name
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_RETURN:
+                    return True
+                elif event.key == pygame.K_BACKSPACE:
+                    name = name[:-1]
+                else:
+                    name += event.unicode
+
+        def draw():
             self.screen.fill(BLACK)
-            prompt_text = font.render('Enter your name:', True, WHITE)
-            self.screen.blit(prompt_text, (SCREEN_WIDTH // 2 - prompt_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            txt_surface = font.render(name, True, WHITE)
-            width = max(200, txt_surface.get_width() + 10)
-            input_box.w = width
+            self.ui_manager.draw_centered(self.screen, 'Enter your name:', SCREEN_HEIGHT // 2 - 50)
+            # The typed name changes on every key, so render it directly rather than caching it
+            txt_surface = self.ui_manager.font.render(name, True, WHITE)
+            input_box.w = max(200, txt_surface.get_width() + 10)
             self.screen.blit(txt_surface, (input_box.x + 5, input_box.y + 5))
             pygame.draw.rect(self.screen, WHITE, input_box, 2)
-            pygame.display.flip()
-            self.clock.tick(30)
+
+        self.menu_loop(handle_event, draw)
+        if not self.running:
+            return 'Player'
         return name if name else 'Player'
 
     def display_game_over(self):
-        self.screen.fill(BLACK)
-        self.ui_manager.draw_game_over(self.screen, self.player.score)
-        pygame.display.flip()
-        pygame.time.delay(3000)
-        self.display_high_scores()
-
-    def display_high_scores(self):
-        displaying = True
-        while displaying:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    displaying = False
-                    self.running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        displaying = False
-            self.screen.fill(BLACK)
-            self.high_score_manager.draw(self.screen)
-            prompt_text = pygame.font.Font(FONT_NAME, FONT_SIZE).render('Press ENTER to Exit', True, WHITE)
-            self.screen.blit(prompt_text, (SCREEN_WIDTH // 2 - prompt_text.get_width() // 2, SCREEN_HEIGHT - 100))
-            pygame.display.flip()
-            self.clock.tick(30)
-
-    def settings_menu(self):
-        in_settings = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        volume = 0.5  # Example setting
-        while in_settings:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    in_settings = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_BACKSPACE:
-                        in_settings = False
-                    elif event.key == pygame.K_UP:
-                        volume = min(1.0, volume + 0.1)
-                    elif event.key == pygame.K_DOWN:
-                        volume = max(0.0, volume - 0.1)
-            self.screen.fill(GRAY)
-            settings_text = font.render('Settings', True, WHITE)
-            volume_text = font.render(f'Volume: {int(volume * 100)}%', True, WHITE)
-            back_text = font.render('Press BACKSPACE to Return', True, WHITE)
-            self.screen.blit(settings_text, (SCREEN_WIDTH // 2 - settings_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            self.screen.blit(volume_text, (SCREEN_WIDTH // 2 - volume_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(back_text, (SCREEN_WIDTH // 2 - back_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
-
-    def level_selection_menu(self):
-        selecting = True
-        selected_level = self.level
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        while selecting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    selecting = False
-                    self.running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_DOWN:
-                        selected_level = min(selected_level + 1, 5)  # Assuming 5 levels
-                    elif event.key == pygame.K_UP:
-                        selected_level = max(selected_level - 1, 1)
-                    elif event.key == pygame.K_RETURN:
-                        self.level = selected_level
-                        selecting = False
-            self.screen.fill(BLACK)
-            title_text = font.render('Select Level:', True, WHITE)
-            self.screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, SCREEN_HEIGHT // 2 - 100))
-            for i in range(1, 6):
-                level_text = font.render(f'Level {i}', True, WHITE if i != selected_level else RED)
-                self.screen.blit(level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50 + (i - 1) * 30))
-            pygame.display.flip()
-            self.clock.tick(30)
+        def handle_event(event):
+            return event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN
 
-    def main_menu(self):
-        menu = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        while menu:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    menu = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        menu = False
-                        self.level_selection_menu()
-                        self.run()
-                    elif event.key == pygame.K_q:
-                        self.running = False
-                        menu = False
+        def draw():
             self.screen.fill(BLACK)
-            title_text = font.render('Rapid Roll Clone', True, WHITE)
-            start_text = font.render('Press ENTER to Start', True, WHITE)
-            quit_text = font.render('Press Q to Quit', True, WHITE)
-            self.screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, SCREEN_HEIGHT // 2 - 100))
-            self.screen.blit(start_text, (SCREEN_WIDTH // 2 - start_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(quit_text, (SCREEN_WIDTH // 2 - quit_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
+            self.ui_manager.draw_game_over(self.screen, self.player.score)
 
-    def start_game(self):
-        self.main_menu()
+        self.menu_loop(handle_event, draw, GAME_OVER_BANNER_TIME)
         if self.running:
-            self.run()
-
-if __name__ == '__main__':
-    game = Game()
-    game.start_game()
-# Sound Manager
-class SoundManager:
-    """Class to manage sound effects and background music."""
-    def __init__(self):
-        self.jump_sound = load_sound(JUMP_SOUND)
-        self.powerup_sound = load_sound(POWERUP_SOUND)
-        self.game_over_sound = load_sound(GAME_OVER_SOUND)
-        self.background_music = os.path.join(ASSET_DIR, 'background_music.mp3')
-
-    def play_jump(self):
-        if self.jump_sound:
-            self.jump_sound.play()
-
-    def play_powerup(self):
-        if self.powerup_sound:
-            self.powerup_sound.play()
+            self.display_high_scores()
 
-    def play_game_over(self):
-        if self.game_over_sound:
-            self.game_over_sound.play()
-
-    def play_background_music(self):
-        pygame.mixer.music.load(self.background_music)
-        pygame.mixer.music.play(-1)  # Loop the background music
-
-# Updated Player class to integrate SoundManager
-class Player(pygame.sprite.Sprite):
-    """Class representing the player character."""
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = load_image(PLAYER_IMAGE, PLAYER_WIDTH, PLAYER_HEIGHT)
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
-        self.velocity_y = 0
-        self.speed = PLAYER_SPEED
-        self.jump_speed = PLAYER_JUMP_SPEED
-        self.lives = 3
-        self.score = 0
-        self.powered_up = False
-        self.power_up_time = 0
-        self.shielded = False
-        self.shield_time = 0
-        self.double_score = False
-        self.double_score_time = 0
-        self.sound_manager = SoundManager()  # New sound manager
-
-    def update(self, platforms):
-        self.handle_input()
-        self.apply_gravity()
-        self.check_collisions(platforms)
-        self.update_power_up_status()
-
-    def handle_input(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
-        if keys[pygame.K_SPACE]:
-            self.jump()
-
-    def jump(self):
-        self.rect.y += 1  # Move down slightly to check for platform
-        hits = pygame.sprite.spritecollide(self, game.platforms, False)
-        self.rect.y -= 1  # Move back to original position
-        if hits:
-            self.velocity_y = -self.jump_speed
-            self.sound_manager.play_jump()
-
-    def apply_gravity(self):
-        self.velocity_y += GRAVITY
-        self.rect.y += self.velocity_y
-        if self.rect.bottom > SCREEN_HEIGHT:
-            self.lives -= 1
-            self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-            self.velocity_y = 0
-            if self.lives <= 0:
-                self.sound_manager.play_game_over()
-
-    def check_collisions(self, platforms):
-        hits = pygame.sprite.spritecollide(self, platforms, False)
-        if hits and self.velocity_y > 0:
-            self.rect.bottom = hits[0].rect.top
-            self.velocity_y = 0
-
-    def update_power_up_status(self):
-        current_time = time.time()
-        if self.powered_up and current_time - self.power_up_time > POWERUP_DURATION:
-            self.powered_up = False
-            self.speed = PLAYER_SPEED
-        if self.shielded and current_time - self.shield_time > POWERUP_DURATION:
-            self.shielded = False
-        if self.double_score and current_time - self.double_score_time > POWERUP_DURATION:
-            self.double_score = False
-
-    def power_up(self, power_type):
-        self.sound_manager.play_powerup()  # Play sound on power-up
-        if power_type == 'extra_life':
-            self.lives += 1
-        elif power_type == 'bonus_star':
-            self.score += 100 if not self.double_score else 200
-        elif power_type == 'power_ball':
-            self.powered_up = True
-            self.power_up_time = time.time()
-            self.speed = PLAYER_SPEED + 3
-        elif power_type == 'time_extension':
-            game.time_left += 30
-        elif power_type == 'shield':
-            self.shielded = True
-            self.shield_time = time.time()
-        elif power_type == 'double_score':
-            self.double_score = True
-            self.double_score_time = time.time()
-
-# High Score Manager with player names and date-time
-class HighScoreManager:
-    """Class to manage high scores."""
-    def __init__(self):
-        self.scores = self.load_scores()
-
-    def load_scores(self):
-        if os.path.exists(HIGH_SCORE_FILE):
-            with open(HIGH_SCORE_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            return []
-
-    def save_scores(self):
-        with open(HIGH_SCORE_FILE, 'w') as f:
-            json.dump(self.scores, f)
+    def display_high_scores(self):
+        def handle_event(event):
+            return event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN
 
-    def add_score(self, name, score):
-        date_time = time.strftime("%Y-%m-%d %H:%M:%S")
-        self.scores.append({'name': name, 'score': score, 'date_time': date_time})
-        self.scores = sorted(self.scores, key=lambda x: x['score'], reverse=True)[:10]
-        self.save_scores()
+        def draw():
+            self.screen.fill(BLACK)
+            self.high_score_manager.draw(self.screen, self.ui_manager)
+            self.ui_manager.draw_centered(self.screen, 'Press ENTER to Exit', SCREEN_HEIGHT - 100)
 
-    def draw(self, screen):
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        title_text = font.render('High Scores', True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 100))
-        for idx, score_entry in enumerate(self.scores):
-            score_text = font.render(f"{idx + 1}. {score_entry['name']} - {score_entry['score']} ({score_entry['date_time']})", True, WHITE)
-            screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, 150 + idx * 30))
-
-# New Power-Up: Slow Motion
-class SlowMotionPowerUp(PowerUp):
-    """Class representing a slow motion power-up."""
-    def __init__(self, x, y):
-        super().__init__(x, y, 'slow_motion')
-
-    def apply_effect(self, player):
-        player.game.slow_motion = True
-        player.game.slow_motion_time = time.time()
-
-# Applying Slow Motion Effect in the Game
-class Game:
-    """Main game class."""
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption('Rapid Roll Clone')
-        self.clock = pygame.time.Clock()
-        self.running = True
-        self.level = 1
-        self.time_left = 120  # seconds per level
-        self.start_time = time.time()
-        self.all_sprites = pygame.sprite.Group()
-        self.platforms = pygame.sprite.Group()
-        self.obstacles = pygame.sprite.Group()
-        self.powerups = pygame.sprite.Group()
-        self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        self.ui_manager = UIManager()
-        self.high_score_manager = HighScoreManager()
-        self.sound_manager = SoundManager()
-        self.backgrounds = [load_image(bg, SCREEN_WIDTH, SCREEN_HEIGHT) for bg in BACKGROUND_IMAGES]
-        self.background = self.backgrounds[0]
-        self.slow_motion = False
-        self.slow_motion_time = 0
-        self.generate_level()
-        self.state = 'playing'
+        self.menu_loop(handle_event, draw)
 
-    def run(self):
-        self.sound_manager.play_background_music()
-        while self.running:
-            self.clock.tick(FPS // 2 if self.slow_motion else FPS)
-            self.handle_events()
-            self.update()
-            self.draw()
-        pygame.quit()
-        sys.exit()
+    def settings_menu(self):
+        volume = 0.5  # Example setting
 
-    def update(self):
-        if self.state == 'playing':
-            self.player.update(self.platforms)
-            self.platforms.update()
-            self.obstacles.update()
-            self.powerups.update()
-            self.check_collisions()
-            self.update_time()
-            self.update_background()
-            self.spawn_platforms_and_obstacles()
-            if self.slow_motion and time.time() - self.slow_motion_time > 5:  # Slow motion lasts 5 seconds
-                self.slow_motion = False
-            if self.player.lives <= 0:
-                self.state = 'game_over'
+        def handle_event(event):
+            nonlocal volume
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_BACKSPACE:
+                    return True
+                elif event.key == pygame.K_UP:
+                    volume = min(1.0, volume + 0.1)
+                elif event.key == pygame.K_DOWN:
+                    volume = max(0.0, volume - 0.1)
+
+        def draw():
+            self.screen.fill(GRAY)
+            self.ui_manager.draw_centered(self.screen, 'Settings', SCREEN_HEIGHT // 2 - 50)
+            self.ui_manager.draw_centered(self.screen, f'Volume: {int(volume * 100)}%', SCREEN_HEIGHT // 2)
+            self.ui_manager.draw_centered(self.screen, 'Press BACKSPACE to Return', SCREEN_HEIGHT // 2 + 50)
 
-    def spawn_platforms_and_obstacles(self):
-        # Check if the player is near the top of the screen and spawn new platforms and obstacles
-        if self.player.rect.top <= SCREEN_HEIGHT / 2:
-            # Adjust all sprites downwards to simulate upward movement
-            for sprite in self.all_sprites:
-                sprite.rect.y += PLAYER_SPEED
+        self.menu_loop(handle_event, draw)
 
-            # Generate new platforms and obstacles at the top of the screen
-            if len(self.platforms) < 10 + self.level * 2:
-                x = random.randint(0, SCREEN_WIDTH - PLATFORM_WIDTH)
-                y = random.randint(-PLATFORM_HEIGHT, 0)
-                platform = Platform(x, y, moving=random.choice([True, False]), disappearing=random.choice([True, False]))
-                self.all_sprites.add(platform)
-                self.platforms.add(platform)
-
-            if len(self.obstacles) < 5 + self.level:
-                x = random.randint(0, SCREEN_WIDTH - OBSTACLE_SIZE)
-                y = random.randint(-OBSTACLE_SIZE, 0)
-                obstacle = Obstacle(x, y, random.choice(list(OBSTACLE_IMAGES.keys())))
-                self.all_sprites.add(obstacle)
-                self.obstacles.add(obstacle)
+    def level_selection_menu(self):
+        selected_level = self.level
 
-    def update_background(self):
-        # Change background based on the player's height (y-position)
-        if self.player.rect.y < SCREEN_HEIGHT / 4:
-            self.background = self.backgrounds[3]  # Highest level background
-        elif self.player.rect.y < SCREEN_HEIGHT / 2:
-            self.background = self.backgrounds[2]
-        elif self.player.rect.y < 3 * SCREEN_HEIGHT / 4:
-            self.background = self.backgrounds[1]
-        else:
-            self.background = self.backgrounds[0]  # Default background
+        def handle_event(event):
+            nonlocal selected_level
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_DOWN:
+                    selected_level = min(selected_level + 1, 5)  # Assuming 5 levels
+                elif event.key == pygame.K_UP:
+                    selected_level = max(selected_level - 1, 1)
+                elif event.key == pygame.K_RETURN:
+                    self.level = selected_level
+                    return True
+
+        def draw():
+            self.screen.fill(BLACK)
+            self.ui_manager.draw_centered(self.screen, 'Select Level:', SCREEN_HEIGHT // 2 - 100)
+            for i in range(1, 6):
+                self.ui_manager.draw_centered(self.screen, f'Level {i}', SCREEN_HEIGHT // 2 - 50 + (i - 1) * 30,
+                                              WHITE if i != selected_level else RED)
 
-    def draw(self):
-        self.screen.blit(self.background, (0, 0))
-        self.all_sprites.draw(self.screen)
-        self.ui_manager.draw(self.screen, self.player, self.time_left)
-        if self.state == 'game_over':
-            self.ui_manager.draw_game_over(self.screen, self.player.score)
-        pygame.display.flip()
+        self.menu_loop(handle_event, draw)
 
-    def handle_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p:
-                    self.pause_menu()
+    def main_menu(self):
+        notice = None
+
+        def handle_event(event):
+            nonlocal notice
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_RETURN:
+                    self.level_selection_menu()
+                    self.run()
+                    return True
+                elif event.key == pygame.K_c and os.path.exists(SAVE_FILE):
+                    try:
+                        self.save_state_manager.load(self)
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading save {SAVE_FILE}: {e}")
+                        self.save_state_manager.discard()
+                        notice = 'Saved game is unreadable'
+                        return
+                    self.run()
+                    return True
                 elif event.key == pygame.K_q:
                     self.running = False
-                elif event.key == pygame.K_r:
-                    self.reset_game()
-
-    def reset_game(self):
-        self.level = 1
-        self.time_left = 120
-        self.start_time = time.time()
-        self.player.lives = 3
-        self.player.score = 0
-        self.generate_level()
-        self.state = 'playing'
-
-    def pause_menu(self):
-        paused = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        while paused:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    paused = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        paused = False
-                    elif event.key == pygame.K_q:
-                        paused = False
-                        self.running = False
-            self.screen.fill(GRAY)
-            pause_text = font.render('Game Paused', True, WHITE)
-            resume_text = font.render('Press R to Resume', True, WHITE)
-            quit_text = font.render('Press Q to Quit', True, WHITE)
-            self.screen.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            self.screen.blit(resume_text, (SCREEN_WIDTH // 2 - resume_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(quit_text, (SCREEN_WIDTH // 2 - quit_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
-
-    def update_time(self):
-        elapsed_time = time.time() - self.start_time
-        self.time_left -= elapsed_time
-        self.start_time = time.time()
-        if self.time_left <= 0:
-            self.level_up()
+                    return True
 
-    def level_up(self):
-        self.level += 1
-        self.time_left = 120
-        self.generate_level()
-        self.ui_manager.draw_level_up(self.screen, self.level)
-        pygame.display.flip()
-        pygame.time.delay(2000)
-    def display_high_scores(self):
-        displaying = True
-        while displaying:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    displaying = False
-                    self.running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        displaying = False
+        def draw():
             self.screen.fill(BLACK)
-            self.high_score_manager.draw(self.screen)
-            prompt_text = pygame.font.Font(FONT_NAME, FONT_SIZE).render('Press ENTER to Exit', True, WHITE)
-            self.screen.blit(prompt_text, (SCREEN_WIDTH // 2 - prompt_text.get_width() // 2, SCREEN_HEIGHT - 100))
-            pygame.display.flip()
-            self.clock.tick(30)
+            self.ui_manager.draw_centered(self.screen, 'Rapid Roll Clone', SCREEN_HEIGHT // 2 - 100)
+            self.ui_manager.draw_centered(self.screen, 'Press ENTER to Start', SCREEN_HEIGHT // 2)
+            self.ui_manager.draw_centered(self.screen, 'Press Q to Quit', SCREEN_HEIGHT // 2 + 50)
+            if os.path.exists(SAVE_FILE):
+                self.ui_manager.draw_centered(self.screen, 'Press C to Continue', SCREEN_HEIGHT // 2 + 100)
+            if notice:
+                self.ui_manager.draw_centered(self.screen, notice, SCREEN_HEIGHT // 2 + 150, RED)
 
-    def main_menu(self):
-        menu = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        while menu:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    menu = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        menu = False
-                        self.level_selection_menu()
-                        self.run()
-                    elif event.key == pygame.K_q:
-                        self.running = False
-                        menu = False
-            self.screen.fill(BLACK)
-            title_text = font.render('Rapid Roll Clone', True, WHITE)
-            start_text = font.render('Press ENTER to Start', True, WHITE)
-            quit_text = font.render('Press Q to Quit', True, WHITE)
-            self.screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, SCREEN_HEIGHT // 2 - 100))
-            self.screen.blit(start_text, (SCREEN_WIDTH // 2 - start_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(quit_text, (SCREEN_WIDTH // 2 - quit_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
+        self.menu_loop(handle_event, draw)
 
     def start_game(self):
         self.main_menu()
         if self.running:
             self.run()
 
-    def settings_menu(self):
-        in_settings = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        volume = 0.5  # Example setting
-        while in_settings:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    in_settings = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_BACKSPACE:
-                        in_settings = False
-                    elif event.key == pygame.K_UP:
-                        volume = min(1.0, volume + 0.1)
-                    elif event.key == pygame.K_DOWN:
-                        volume = max(0.0, volume - 0.1)
-            self.screen.fill(GRAY)
-            settings_text = font.render('Settings', True, WHITE)
-            volume_text = font.render(f'Volume: {int(volume * 100)}%', True, WHITE)
-            back_text = font.render('Press BACKSPACE to Return', True, WHITE)
-            self.screen.blit(settings_text, (SCREEN_WIDTH // 2 - settings_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            self.screen.blit(volume_text, (SCREEN_WIDTH // 2 - volume_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(back_text, (SCREEN_WIDTH // 2 - back_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
-
-    def update_time(self):
-        elapsed_time = time.time() - self.start_time
-        self.time_left -= elapsed_time
-        self.start_time = time.time()
-        if self.time_left <= 0:
-            self.level_up()
-
-    def level_up(self):
-        self.level += 1
-        self.time_left = 120
-        self.generate_level()
-        self.ui_manager.draw_level_up(self.screen, self.level)
-        pygame.display.flip()
-        pygame.time.delay(2000)
-
-    def game_over(self):
-        self.running = False
-        name = self.get_player_name()
-        self.high_score_manager.add_score(name, self.player.score)
-        self.display_game_over()
-
-    def get_player_name(self):
-        name = ''
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        input_box = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2, 200, 30)
-        active = True
-        while active:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    active = False
-                    self.running = False
-                    return 'Player'
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        active = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        name = name[:-1]
-                    else:
-                        name += event.unicode
-            self.screen.fill(BLACK)
-            prompt_text = font.render('Enter your name:', True, WHITE)
-            self.screen.blit(prompt_text, (SCREEN_WIDTH // 2 - prompt_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            txt_surface = font.render(name, True, WHITE)
-            width = max(200, txt_surface.get_width() + 10)
-            input_box.w = width
-            self.screen.blit(txt_surface, (input_box.x + 5, input_box.y + 5))
-            pygame.draw.rect(self.screen, WHITE, input_box, 2)
-            pygame.display.flip()
-            self.clock.tick(30)
-        return name if name else 'Player'
-
-    def display_game_over(self):
-        self.screen.fill(BLACK)
-        self.ui_manager.draw_game_over(self.screen, self.player.score)
-        pygame.display.flip()
-        pygame.time.delay(3000)
-        self.display_high_scores()
-
-    def display_high_scores(self):
-        displaying = True
-        while displaying:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    displaying = False
-                    self.running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        displaying = False
-            self.screen.fill(BLACK)
-            self.high_score_manager.draw(self.screen)
-            prompt_text = pygame.font.Font(FONT_NAME, FONT_SIZE).render('Press ENTER to Exit', True, WHITE)
-            self.screen.blit(prompt_text, (SCREEN_WIDTH // 2 - prompt_text.get_width() // 2, SCREEN_HEIGHT - 100))
-            pygame.display.flip()
-            self.clock.tick(30)
-
-    def pause_menu(self):
-        paused = True
-        font = pygame.font.Font(FONT_NAME, FONT_SIZE)
-        while paused:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    paused = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        paused = False
-                    elif event.key == pygame.K_q:
-                        paused = False
-                        self.running = False
-            self.screen.fill(GRAY)
-            pause_text = font.render('Game Paused', True, WHITE)
-            resume_text = font.render('Press R to Resume', True, WHITE)
-            quit_text = font.render('Press Q to Quit', True, WHITE)
-            self.screen.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-            self.screen.blit(resume_text, (SCREEN_WIDTH // 2 - resume_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(quit_text, (SCREEN_WIDTH // 2 - quit_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-            pygame.display.flip()
-            self.clock.tick(30)
-
-    def reset_game(self):
-        self.level = 1
-        self.time_left = 120
-        self.start_time = time.time()
-        self.player.lives = 3
-        self.player.score = 0
-        self.generate_level()
-        self.state = 'playing'
-
-    def run(self):
-        self.sound_manager.play_background_music()
-        while self.running:
-            self.clock.tick(FPS // 2 if self.slow_motion else FPS)
-            self.handle_events()
-            self.update()
-            self.draw()
-        pygame.quit()
-        sys.exit()
+class ObservationManager:
+    """Class to turn games into NumPy observations: downsampled grayscale frames and occupancy grids."""
+    GRAY_WEIGHTS = (0.299, 0.587, 0.114)
+    GRID_CHANNELS = 4  # platforms, obstacles, power-ups, player
+
+    def __init__(self, stride=OBSERVATION_STRIDE):
+        if np is None:
+            print("Observations need numpy")
+            sys.exit(1)
+        self.stride = stride
+        self.width = SCREEN_WIDTH // stride
+        self.height = SCREEN_HEIGHT // stride
+        self.weights = np.array(self.GRAY_WEIGHTS, np.float32)
+        self.canvas = None  # Offscreen screen for headless games, created on first use
+        self.backdrops = {}  # Background -> opaque copy, which blits several times faster than the alpha original
+
+    def frame(self, surface, out=None):
+        """Sample every stride-th pixel of surface into a (height, width) uint8 grayscale array."""
+        if out is None:
+            out = np.empty((self.height, self.width), np.uint8)
+        stride = self.stride
+        # pixels3d is a view of the surface memory and the slice is a strided view of that, so only
+        # the sampled pixels are ever read; both must be dropped to unlock the surface again
+        pixels = pygame.surfarray.pixels3d(surface)
+        sampled = pixels[:self.width * stride:stride, :self.height * stride:stride]
+        gray = sampled @ self.weights
+        del sampled, pixels
+        np.copyto(out, gray.T, casting='unsafe')
+        return out
+
+    def draw(self, game):
+        """Draw the world of a game without a screen onto the shared canvas, leaving out the HUD."""
+        if self.canvas is None:
+            self.canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        backdrop = self.backdrops.get(game.background)
+        if backdrop is None:
+            backdrop = self.backdrops[game.background] = game.background.convert()
+        self.canvas.blit(backdrop, (0, 0))
+        self.canvas.blits([(sprite.image, sprite.rect.topleft) for sprite in game.lifecycle.sprites], doreturn=False)
+        return self.canvas
+
+    def occupancy(self, game, out=None):
+        """Rasterise entity rects straight into a (GRID_CHANNELS, height, width) uint8 grid, without rendering."""
+        if out is None:
+            out = np.empty((self.GRID_CHANNELS, self.height, self.width), np.uint8)
+        out.fill(0)
+        stride = self.stride
+        lifecycle = game.lifecycle
+        for layer, group in zip(out, (lifecycle.platforms, lifecycle.obstacles, lifecycle.powerups, (game.player,))):
+            for sprite in group:
+                rect = sprite.rect
+                # Any cell the rect touches is occupied; clamp so rects above or left of the screen don't wrap
+                top, bottom = max(0, rect.top // stride), max(0, -(-rect.bottom // stride))
+                left, right = max(0, rect.left // stride), max(0, -(-rect.right // stride))
+                layer[top:bottom, left:right] = 1
+        return out
+
+class VectorEnv:
+    """Class to step several headless games together and return their results as arrays."""
+    # Action index -> (direction, jump)
+    ACTIONS = ((0, False), (-1, False), (1, False), (0, True), (-1, True), (1, True))
+    # Player x, y, velocity, grounded, lives, time left, shield, double score, then offsets to nearby sprites
+    OBSERVATION_SIZE = 8 + 4 * ENV_NEAREST
+
+    def __init__(self, count, observation='features'):
+        """observation is 'features' for state vectors, 'frame' for grayscale frames or 'grid' for occupancy grids."""
+        if np is None:
+            print("The vectorized environment needs numpy")
+            sys.exit(1)
+        if pygame.display.get_surface() is None:
+            # Images are converted to the display format when loaded, so a hidden mode is still needed
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        self.games = [Game(headless=True) for _ in range(count)]
+        self.observation = observation
+        self.observer = ObservationManager()
+        if observation == 'frame':
+            self.observations = np.zeros((count, self.observer.height, self.observer.width), np.uint8)
+        elif observation == 'grid':
+            self.observations = np.zeros((count, ObservationManager.GRID_CHANNELS, self.observer.height,
+                                          self.observer.width), np.uint8)
+        else:
+            self.observations = np.zeros((count, self.OBSERVATION_SIZE), np.float32)
+        self.rewards = np.zeros(count, np.float32)
+        self.dones = np.zeros(count, bool)
+        self.scale = np.array([SCREEN_WIDTH, SCREEN_HEIGHT], np.float32)
+
+    def reset(self, seeds=None):
+        """Start a new episode in every game and return the first observations."""
+        if seeds is None:
+            seeds = [None] * len(self.games)
+        for index, (game, seed) in enumerate(zip(self.games, seeds)):
+            game.reset_game(seed)
+            self.observe(index, game)
+        return self.observations.copy()
+
+    def step(self, actions):
+        """Advance every game by one update and return (observations, rewards, dones).
+
+        Finished games restart straight away from their own generator, so their observation
+        is the first one of the next episode.
+        """
+        for index, (game, action) in enumerate(zip(self.games, actions)):
+            player = game.player
+            score, lives = player.score, player.lives
+            game.update(self.ACTIONS[action])
+            self.rewards[index] = player.score - score - ENV_LIFE_PENALTY * max(0, lives - player.lives)
+            self.dones[index] = game.state == 'game_over'
+            if self.dones[index]:
+                game.reset_game()
+            self.observe(index, game)
+        return self.observations.copy(), self.rewards.copy(), self.dones.copy()
+
+    def observe(self, index, game):
+        if self.observation == 'frame':
+            self.observer.frame(self.observer.draw(game), self.observations[index])
+            return
+        if self.observation == 'grid':
+            self.observer.occupancy(game, self.observations[index])
+            return
+        player = game.player
+        x, y = player.rect.center
+        row = self.observations[index]
+        row[:8] = (x / SCREEN_WIDTH, y / SCREEN_HEIGHT, player.velocity_y / PLAYER_JUMP_SPEED,
+                   player.contacts.grounded, player.lives / 3, game.time_left / 120,
+                   player.shielded, player.double_score)
+        row[8:8 + 2 * ENV_NEAREST] = self.nearest(game.lifecycle.platforms, x, y)
+        row[8 + 2 * ENV_NEAREST:] = self.nearest(game.lifecycle.obstacles, x, y)
+
+    def nearest(self, group, x, y):
+        """Offsets from (x, y) to the ENV_NEAREST closest sprites in group, in screen units and zero-padded."""
+        offsets = np.zeros((ENV_NEAREST, 2), np.float32)
+        if group:
+            centers = np.array([sprite.rect.center for sprite in group], np.float32)
+            centers -= (x, y)
+            centers /= self.scale
+            closest = np.argsort((centers * centers).sum(axis=1))[:ENV_NEAREST]
+            offsets[:len(closest)] = centers[closest]
+        return offsets.ravel()
 
 if __name__ == '__main__':
-    game = Game()
-    game.start_game()
+    if '--record' in sys.argv:
+        CAPTURE_ENABLED = True
+    if '--latency' in sys.argv:
+        INPUT_LATENCY_TRACKING = True
+    if '--late-latch' in sys.argv:
+        INPUT_LATENCY_TRACKING = LATE_LATCH_INPUT = True
+    if '--spectate' in sys.argv:
+        SpectatorViewer().run()
+    else:
+        game = Game()
+        game.start_game()
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+# main.py opens a display and loads assets and game data relative to the working directory at import
+# time, so the tests run from a scratch directory laid out like the repo, with dummy SDL drivers
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+def pytest_configure(config):
+    workdir = tempfile.mkdtemp(prefix='rapidroll-')
+    assets = os.path.join(workdir, 'assets')
+    os.mkdir(assets)
+    for name in os.listdir(os.path.join(REPO, 'assets')):
+        # Some asset files differ in case from the paths main.py uses, so link both spellings
+        for alias in {name, name.lower()}:
+            os.symlink(os.path.join(REPO, 'assets', name), os.path.join(assets, alias))
+    os.symlink(os.path.join(REPO, 'game_data.json'), os.path.join(workdir, 'game_data.json'))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO)
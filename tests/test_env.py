@@ -0,0 +1,49 @@
+import numpy as np
+
+import main
+
+
+def run(env, seeds, steps):
+    env.reset(seeds)
+    rng = np.random.default_rng(0)
+    history = []
+    for _ in range(steps):
+        observations, rewards, dones = env.step(rng.integers(0, len(main.VectorEnv.ACTIONS), len(seeds)))
+        history.append((observations, rewards, dones))
+    return history
+
+
+def test_import_uses_the_current_game():
+    game = main.VectorEnv(1).games[0]
+    assert game.headless and game.player.game is game
+
+
+def test_vector_env_steps_and_replays_seeds():
+    env = main.VectorEnv(4)
+    first = run(env, [1, 2, 3, 4], 300)
+    second = run(env, [1, 2, 3, 4], 300)
+    observations, rewards, dones = first[-1]
+    assert observations.shape == (4, main.VectorEnv.OBSERVATION_SIZE)
+    assert rewards.shape == dones.shape == (4,)
+    for (a, b, c), (x, y, z) in zip(first, second):
+        assert np.array_equal(a, x) and np.array_equal(b, y) and np.array_equal(c, z)
+
+
+def test_frame_observations():
+    env = main.VectorEnv(2, 'frame')
+    observer = env.observer
+    observations, _, _ = run(env, [1, 2], 50)[-1]
+    assert observations.shape == (2, observer.height, observer.width)
+    assert observations.dtype == np.uint8 and observations.any()
+    # Sampling through a pixel view must leave the surface unlocked for the next blit
+    assert not observer.canvas.get_locked()
+
+
+def test_grid_observations():
+    env = main.VectorEnv(2, 'grid')
+    observer = env.observer
+    observations, _, _ = run(env, [1, 2], 50)[-1]
+    assert observations.shape == (2, main.ObservationManager.GRID_CHANNELS, observer.height, observer.width)
+    assert observations.dtype == np.uint8
+    # The player is always on screen, so its channel is never empty
+    assert observations[:, -1].any(axis=(1, 2)).all()
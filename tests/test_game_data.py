@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'game_data.json'
+    with open(main.GAME_DATA_FILE) as f:
+        path.write_text(f.read())
+    return path
+
+
+def edit(path, change):
+    data = json.loads(path.read_text())
+    change(data)
+    path.write_text(json.dumps(data))
+    # Make sure the reload sees a new mtime even on coarse-grained filesystems
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+@pytest.mark.parametrize('change', [
+    lambda data: data['levels']['obstacles'].update(per_level=0.5),
+    lambda data: data['levels']['platforms'].update(base='10'),
+    lambda data: data['levels']['powerups'].update(base=-1),
+    lambda data: data['obstacles']['spike'].update(speed=[5, 2]),
+    lambda data: data['obstacles']['bomb'].update(speed=[2, 4.5]),
+    lambda data: data['powerups']['bonus_star'].update(amount='100'),
+    lambda data: data['powerups']['power_ball'].update(amount=2.5),
+])
+def test_invalid_edit_keeps_previous_tables(data_file, change):
+    game_data = main.GameData(str(data_file))
+    curves, speeds = list(game_data.level_curves), list(game_data.obstacle_speeds)
+    effects = list(game_data.powerup_effects)
+    edit(data_file, change)
+    game_data.next_check = 0
+    assert not game_data.poll()
+    assert game_data.level_curves == curves and game_data.obstacle_speeds == speeds
+    assert game_data.powerup_effects == effects
+
+
+def test_whole_number_floats_are_cast(data_file):
+    edit(data_file, lambda data: data['levels']['obstacles'].update(per_level=2.0))
+    game_data = main.GameData(str(data_file))
+    count = game_data.level_count(main.LEVEL_OBSTACLES, 3)
+    assert count == 11 and isinstance(count, int)
+
+
+def test_fractional_safe_platform_curve_is_rejected(data_file):
+    game_data = main.GameData(str(data_file))
+    curve = game_data.safe_curve
+    edit(data_file, lambda data: data['difficulty']['safe_platforms'].update(per_level=-0.5))
+    game_data.next_check = 0
+    assert not game_data.poll()
+    assert game_data.safe_curve == curve
@@ -0,0 +1,53 @@
+import collections
+
+import pygame
+
+import main
+
+
+def key(event_type, key):
+    return pygame.event.Event(event_type, key=key, mod=0, unicode='', scancode=0)
+
+
+def test_latch_leaves_the_event_queue_alone():
+    main.VectorEnv(1)  # Opens the hidden display the event queue needs
+    pygame.event.clear()
+    posted = [key(pygame.KEYDOWN, pygame.K_p), key(pygame.KEYDOWN, pygame.K_LEFT),
+              pygame.event.Event(pygame.USEREVENT, code=1), key(pygame.KEYUP, pygame.K_LEFT)]
+    for event in posted:
+        pygame.event.post(event)
+    manager = main.InputLatencyManager(late_latch=True)
+    manager.step()
+    queued = [event for event in pygame.event.get() if event.type in (pygame.KEYDOWN, pygame.KEYUP, pygame.USEREVENT)]
+    assert [(event.type, event.dict) for event in queued] == [(event.type, event.dict) for event in posted]
+
+
+def test_key_changes_are_stamped_once():
+    manager = main.InputLatencyManager()
+    # A change latch() already stamped from the key state is skipped when its event arrives
+    manager.pressed[pygame.K_LEFT] = True
+    manager.latched[pygame.K_LEFT] = 1
+    manager.pending.append(0.0)
+    manager.received([key(pygame.KEYDOWN, pygame.K_LEFT), key(pygame.KEYDOWN, pygame.K_p),
+                      key(pygame.KEYUP, pygame.K_LEFT), key(pygame.KEYDOWN, pygame.K_SPACE)])
+    assert len(manager.pending) == 3
+    assert manager.pressed == {pygame.K_LEFT: False, pygame.K_RIGHT: False, pygame.K_SPACE: True}
+    manager.step()
+    inputs = manager.collect()
+    assert len(inputs) == 3 and not manager.pending
+    manager.presented(inputs)
+    assert manager.latency.count == 3
+
+
+def test_latch_stamps_key_state_changes(monkeypatch):
+    main.VectorEnv(1)
+    state = collections.defaultdict(bool)
+    monkeypatch.setattr(pygame.key, 'get_pressed', lambda: state)
+    manager = main.InputLatencyManager(late_latch=True)
+    state[pygame.K_SPACE] = True
+    manager.step()
+    assert len(manager.collect()) == 1
+    # The event behind the change arrives at the next handle_events and isn't counted again
+    manager.received([key(pygame.KEYDOWN, pygame.K_SPACE)])
+    manager.step()
+    assert manager.collect() == ()
@@ -0,0 +1,59 @@
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    collector = main.GCManager(control=False)
+    metrics = main.MetricsManager(collector, path=str(tmp_path / 'metrics.prom'), port=0)
+    yield metrics
+    metrics.close()
+    collector.close()
+
+
+def scrape(metrics, path='/metrics'):
+    port = metrics.server.server_address[1]
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+        return response.headers['Content-Type'], response.read().decode()
+
+
+def test_scrape_serves_recorded_frames(metrics, tmp_path):
+    game = main.VectorEnv(1).games[0]
+    for tick_time in (0.001, 0.003, 0.2):
+        metrics.record_frame(game, 1 / main.FPS, tick_time, 0.002)
+    content_type, body = scrape(metrics)
+    assert content_type.startswith('text/plain')
+    lines = body.splitlines()
+    assert 'rapidroll_frames_total 3' in lines
+    assert 'rapidroll_tick_seconds_count 3' in lines
+    assert 'rapidroll_tick_seconds_bucket{le="0.004"} 2' in lines
+    assert 'rapidroll_render_seconds_count 3' in lines
+    assert f'rapidroll_entities{{group="platforms"}} {len(game.platforms)}' in lines
+    # The file written on close carries the same samples
+    metrics.close()
+    assert 'rapidroll_tick_seconds_count 3' in (tmp_path / 'metrics.prom').read_text().splitlines()
+
+
+def test_scrape_other_paths_are_not_found(metrics):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        scrape(metrics, '/')
+    assert error.value.code == 404
+
+
+def test_resume_drops_the_blocked_time():
+    pacer = main.FramePacer()
+    pacer.wait()
+    tick_start = time.perf_counter()
+    time.sleep(0.2)  # Stands in for the pause menu blocking inside handle_events
+    pacer.resume()
+    assert max(tick_start, pacer.resumed) - tick_start >= 0.2
+    assert time.perf_counter() - max(tick_start, pacer.resumed) < 0.05
+    start = time.perf_counter()
+    pacer.wait()
+    # Neither the next frame time nor the pacing counts the pause
+    assert pacer.frame_time < 0.05 and time.perf_counter() - start < 0.05
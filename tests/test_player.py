@@ -0,0 +1,82 @@
+import main
+
+
+def falling_player(game, bottom, velocity_y):
+    player = game.player
+    player.contacts.release()
+    player.rect.bottom = bottom
+    player.velocity_y = velocity_y
+    return player
+
+
+def test_fast_fall_past_the_screen_bottom_lands_on_a_crossed_platform():
+    game = main.VectorEnv(1).games[0]
+    platform = main.Platform(0, 585)
+    player = falling_player(game, 570, 30)
+    player.rect.x = platform.rect.x
+    player.update([platform], (0, False))
+    assert player.lives == 3
+    assert player.contacts.ground is platform
+    assert player.rect.bottom == platform.rect.top
+
+
+def test_fall_past_the_screen_bottom_without_a_platform_loses_a_life():
+    game = main.VectorEnv(1).games[0]
+    player = falling_player(game, 570, 30)
+    player.update([], (0, False))
+    assert player.lives == 2
+    assert player.rect.center == (main.SCREEN_WIDTH // 2, main.SCREEN_HEIGHT // 2)
+    assert not player.contacts.grounded
+
+
+def test_swept_fall_does_not_tunnel_through_a_platform():
+    game = main.VectorEnv(1).games[0]
+    platform = main.Platform(0, 300)
+    player = falling_player(game, 280, 40)
+    player.rect.x = platform.rect.x
+    player.update([platform], (0, False))
+    assert player.contacts.ground is platform and player.rect.bottom == 300
+
+
+def standing_player(game, platform):
+    player = game.player
+    player.rect.midbottom = platform.rect.midtop
+    player.velocity_y = 0
+    player.contacts.land(platform)
+    game.platforms.add(platform)
+    return player
+
+
+def test_jump_only_leaves_the_ground_once():
+    game = main.VectorEnv(1).games[0]
+    platform = main.Platform(300, 400)
+    player = standing_player(game, platform)
+    player.update([platform], (0, True))
+    assert not player.contacts.grounded and player.velocity_y < 0
+    velocity = player.velocity_y
+    # Holding jump in mid-air does nothing without a supporting platform
+    player.update([platform], (0, True))
+    assert player.velocity_y == velocity + main.GRAVITY
+
+
+def test_player_is_carried_by_a_moving_platform():
+    game = main.VectorEnv(1).games[0]
+    platform = main.Platform(300, 400, moving=True)
+    player = standing_player(game, platform)
+    offset = player.rect.x - platform.rect.x
+    for _ in range(30):
+        platform.update(player.contacts.ground, game.now)
+        player.update([platform], (0, False))
+        assert player.contacts.ground is platform
+        assert player.rect.x - platform.rect.x == offset and player.rect.bottom == platform.rect.top
+
+
+def test_disappearing_platform_drops_the_player():
+    game = main.VectorEnv(1).games[0]
+    platform = main.Platform(300, 400, disappearing=True)
+    player = standing_player(game, platform)
+    platform.update(player.contacts.ground, 0.0)
+    platform.update(player.contacts.ground, main.DISAPPEAR_DURATION + 1)
+    assert not platform.alive()
+    player.update([], (0, False))
+    assert not player.contacts.grounded and player.velocity_y > 0
@@ -0,0 +1,87 @@
+import pytest
+
+import main
+
+
+@pytest.fixture
+def game():
+    game = main.VectorEnv(1).games[0]
+    game.reset_game(seed=5)
+    for _ in range(100):
+        game.update()
+    return game
+
+
+def trace(game, steps=200):
+    positions = []
+    for _ in range(steps):
+        game.update()
+        positions.append((game.player.rect.topleft, game.player.score, len(game.all_sprites)))
+    return positions
+
+
+def test_load_replays_and_consumes_the_save(game, tmp_path):
+    path = tmp_path / 'savegame.bin'
+    manager = game.save_state_manager
+    manager.save(game, str(path))
+    expected = trace(game)
+    manager.load(game, str(path))
+    assert not path.exists()
+    assert trace(game) == expected
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:10],
+    lambda data: b'XXXX' + data[4:],
+    lambda data: data[:-7],
+])
+def test_unreadable_save_raises_value_error_without_touching_the_game(game, tmp_path, damage):
+    path = tmp_path / 'savegame.bin'
+    manager = game.save_state_manager
+    data = manager.pack(game)
+    path.write_bytes(damage(data))
+    before = manager.pack(game)
+    with pytest.raises(ValueError):
+        manager.load(game, str(path))
+    assert manager.pack(game) == before
+
+
+def key(key):
+    return main.pygame.event.Event(main.pygame.KEYDOWN, key=key, mod=0, unicode='', scancode=0)
+
+
+@pytest.fixture
+def save_path():
+    yield main.SAVE_FILE
+    if main.os.path.exists(main.SAVE_FILE):
+        main.os.remove(main.SAVE_FILE)
+
+
+def test_save_during_the_level_banner_starts_the_next_level(game, save_path):
+    game.time_left = 0
+    game.update()
+    assert game.state == 'level_up'
+    game.save_game()
+    restored = main.VectorEnv(1).games[0]
+    restored.save_state_manager.load(restored)
+    assert (restored.level, restored.state) == (2, 'playing')
+    assert len(restored.platforms) == len(game.platforms)
+
+
+@pytest.mark.parametrize('in_pause_menu', [False, True], ids=['playing', 'pause menu'])
+def test_quitting_with_q_saves(save_path, in_pause_menu):
+    game = main.Game(seed=1)
+    try:
+        main.pygame.event.clear()
+        main.pygame.event.post(key(main.pygame.K_q))
+        # The pause menu reads the queue itself, so it is opened directly rather than through a queued P
+        if in_pause_menu:
+            game.pause_menu()
+        else:
+            game.handle_events()
+        assert not game.running and game.save_on_exit
+        game.save_game()
+        assert main.os.path.exists(save_path)
+    finally:
+        game.gc_manager.close()
@@ -0,0 +1,38 @@
+import collections
+import random
+
+import main
+
+
+def director(level=1):
+    spawn_director = main.SpawnDirector(random.Random(1))
+    spawn_director.reset(level)
+    return spawn_director
+
+
+def test_batches_follow_the_level_weights():
+    spawn_director = director(5)
+    weights = main.GAME_DATA.spawn_weights(main.LEVEL_POWERUPS, 5)
+    draws = collections.Counter(spawn_director.powerup() for _ in range(spawn_director.batch_size * 100))
+    total = sum(weights)
+    for power_type, weight in zip(main.POWERUP_TYPES, weights):
+        assert abs(draws[power_type] / sum(draws.values()) - weight / total) < 0.02
+
+
+def test_safe_platforms_below_the_screen_do_not_count():
+    spawn_director = director()
+    needed = main.GAME_DATA.safe_platforms(1)
+    below = [main.Platform(0, main.SCREEN_HEIGHT + 10) for _ in range(needed)]
+    ahead = [main.Platform(0, y) for y in range(0, needed * 50, 50)]
+    assert all(spawn_director.platform(below) == (False, False) for _ in range(50))
+    kinds = {spawn_director.platform(ahead) for _ in range(50)}
+    assert kinds != {(False, False)}
+
+
+def test_hazard_budget_caps_obstacle_cost():
+    spawn_director = director()
+    obstacles = []
+    while (obstacle_type := spawn_director.obstacle(obstacles)) is not None:
+        obstacles.append(main.Obstacle(0, -100, obstacle_type, random.Random(0)))
+    cost = sum(main.GAME_DATA.obstacle_costs[obstacle.type_id] for obstacle in obstacles)
+    assert 0 < cost <= main.GAME_DATA.hazard_budget(1)
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def game():
+    return main.VectorEnv(1).games[0]
+
+
+@pytest.fixture
+def stream():
+    stream = main.SpectatorStream(('127.0.0.1', 0))
+    yield stream
+    stream.close()
+
+
+def expected(game):
+    return sorted((main.ENTITY_KIND_INDEX['player' if sprite is game.player else
+                                          'platform' if isinstance(sprite, main.Platform) else sprite.type],
+                   *sprite.rect.topleft) for sprite in game.all_sprites)
+
+
+def mirrored(viewer):
+    return sorted(tuple(entity) for entity in viewer.entities.values())
+
+
+def sync(stream, game, viewer):
+    stream.publish(game)
+    deadline = time.time() + 2
+    while time.time() < deadline:
+        viewer.receive()
+        if mirrored(viewer) == expected(game):
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_loopback_round_trip(game, stream):
+    # The first tick spawns everything, later ticks move, despawn and spawn sprites
+    viewer = main.SpectatorViewer(stream.address)
+    assert viewer.connect()
+    assert sync(stream, game, viewer)
+    for tick in range(300):
+        game.player.lives = 3
+        game.update()
+        if tick % 20 == 0:
+            next(iter(game.platforms)).kill()
+        assert sync(stream, game, viewer), tick
+    # A spectator joining late starts from a keyframe of the same state
+    late = main.SpectatorViewer(stream.address)
+    assert late.connect()
+    assert sync(stream, game, late)
+
+
+def test_ids_are_reused_instead_of_wrapping(game, stream):
+    stream.publish(game)
+    player_id = stream.entities[game.player][0]
+    for _ in range(500):
+        for platform in list(game.platforms)[:3]:
+            platform.kill()
+            replacement = main.Platform(platform.rect.x, platform.rect.y)
+            game.all_sprites.add(replacement)
+            game.platforms.add(replacement)
+        stream.publish(game)
+        ids = [entry[0] for entry in stream.entities.values()]
+        assert len(ids) == len(set(ids))
+        assert stream.entities[game.player][0] == player_id
+    # Churn recycles IDs, so the counter only grows with the number of live entities
+    assert stream.next_id <= len(game.all_sprites) + 3
+
+
+def test_viewer_skips_unknown_ids(stream, game):
+    viewer = main.SpectatorViewer(stream.address)
+    header = main.SpectatorStream.HEADER.pack(1, 0, 0, 3, 0, 100)
+    viewer.apply(header + main.SpectatorStream.MOVE.pack(main.SpectatorStream.OP_MOVE, 42, 1, 1)
+                 + main.SpectatorStream.REMOVE.pack(main.SpectatorStream.OP_REMOVE, 43))
+    assert viewer.entities == {}